@@ -12,146 +12,284 @@
 
 import re
 import json
+import mmap
 import sys
 import argparse
 from pathlib import Path
 from typing import Dict, List, Tuple
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 import statistics
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 수신 완료 블록의 구분선. 고정 문자열이므로 정규식 대신 split으로 자른다.
+_BLOCK_DELIM = b"=" * 50
+_BLOCK_MARKER = "파일 수신 완료:".encode()
+
+# 블록 내 모든 필드를 한 번의 스캔으로 추출하는 통합 패턴.
+# finditer + lastgroup으로 필드를 구분한다. (UDP의 "수신 패킷: n/m" 형식이
+# RUDP의 "수신 패킷: n" 형식보다 먼저 매칭되도록 순서를 유지할 것)
+_FIELDS_RE = re.compile(
+    (
+        r"파일 수신 완료:\s*(?P<fname>\S+)"
+        r"|파일 크기:\s*(?P<size_bytes>[\d,]+)\s*bytes\s*\((?P<size_mb>[\d.]+)\s*MB\)"
+        r"|전송 속도:\s*(?P<speed>[\d.]+)\s*MB/s"
+        r"|순수 전송 시간:\s*(?P<ttime>[\d.]+)초"
+        r"|예상 패킷:\s*(?P<expected>\d+)"
+        r"|수신 패킷:\s*(?P<udp_rx>\d+)/(?P<udp_expected>\d+)"
+        r"|수신 패킷:\s*(?P<received>\d+)"
+        r"|손실 패킷:\s*(?P<lost>\d+)"
+    ).encode()
+)
+
+# 프로토콜 감지에 쓰이는 로그 내용 키워드
+_KW_LOST = "손실 패킷:".encode()
+_KW_RESEND = "재전송".encode()
+_KW_LOSS_RATE = "패킷 손실률:".encode()
+
+# 서버 시작 배너는 로그 머리부에만 나오므로 앞부분만 스캔하면 충분하다
+_HEAD_SCAN_LIMIT = 8192
+_BANNER_SWITCH = (
+    ("TCP로 서버 시작".encode(), "TCP"),
+    ("UDP 서버 시작".encode(), "UDP"),
+    (b"RUDP", "RUDP"),
+    (b"QUIC", "QUIC"),
+)
+
+
+def _speed_stats(values: List[float]) -> Tuple[float, float, float, float]:
+    """(평균, 최소, 최대, 표준편차) 계산. numpy가 있으면 벡터 연산 사용
+
+    numpy가 없으면 Welford 알고리즘으로 한 번의 순회에 네 값을 모두 구한다.
+    (statistics.stdev는 내부적으로 두 번 순회하며 고정밀 연산을 사용)
+    """
+    if np is not None:
+        arr = np.asarray(values, dtype=np.float64)
+        std_dev = float(arr.std(ddof=1)) if arr.size > 1 else 0.0
+        return float(arr.mean()), float(arr.min()), float(arr.max()), std_dev
+
+    n = 0
+    mean = 0.0
+    s = 0.0
+    low = high = values[0]
+    for x in values:
+        n += 1
+        delta = x - mean
+        mean += delta / n
+        s += delta * (x - mean)
+        if x < low:
+            low = x
+        elif x > high:
+            high = x
+    std_dev = (s / (n - 1)) ** 0.5 if n > 1 else 0.0
+    return mean, low, high, std_dev
+
+
+def _mean(values: List[float]) -> float:
+    """평균 계산. numpy가 있으면 벡터 연산 사용"""
+    if np is not None:
+        return float(np.asarray(values, dtype=np.float64).mean())
+    return statistics.mean(values)
+
 
 class ServerLogAnalyzer:
     """서버 로그 분석기"""
 
     def __init__(self):
         self.records = []
+        self._protocol_cache = {}
 
     def parse_log_file(self, log_file: str) -> List[Dict]:
         """로그 파일에서 전송 기록 추출"""
         records = []
 
-        with open(log_file, "r", encoding="utf-8") as f:
-            content = f.read()
-
-        # 프로토콜 타입 추정 (파일명 또는 로그 내용에서)
-        protocol = self._detect_protocol(log_file, content)
-
-        # 파일 수신 완료 블록 찾기
-        # ========== 로 구분된 블록 추출
-        blocks = re.findall(r"={50}.*?파일 수신 완료:.*?={50}", content, re.DOTALL)
-
+        # 파일 전체를 str로 디코딩하지 않고 mmap 위에서 바이트 패턴으로 스캔
+        with open(log_file, "rb") as f:
+            if Path(log_file).stat().st_size == 0:
+                return records
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                # 프로토콜 타입 추정 (파일명 또는 로그 내용에서)
+                protocol = self._detect_protocol(log_file, content)
+
+                # 파일 수신 완료 블록 찾기
+                # ========== 구분선은 고정 문자열이므로 DOTALL 정규식 대신
+                # mmap.find로 구분선 오프셋을 따라가며 구분선 사이 조각만
+                # 잘라낸다 (파일 전체를 메모리로 복사하지 않음)
+                blocks = []
+                delim_len = len(_BLOCK_DELIM)
+                pos = content.find(_BLOCK_DELIM)
+                while pos != -1:
+                    start = pos + delim_len
+                    end = content.find(_BLOCK_DELIM, start)
+                    if end == -1:
+                        break
+                    block = content[start:end]
+                    if _BLOCK_MARKER in block:
+                        blocks.append(block)
+                    pos = content.find(_BLOCK_DELIM, end + delim_len)
+
+        # 블록 파서는 프로토콜 감지 후 한 번만 선택 (블록마다 분기하지 않음)
+        parse_block = getattr(
+            self, "_parse_block_" + protocol.lower(), self._parse_block_default
+        )
         for block in blocks:
-            record = self._parse_block(block, protocol)
+            record = parse_block(block, protocol)
             if record:
                 records.append(record)
 
         return records
 
-    def _detect_protocol(self, filename: str, content: str) -> str:
-        """프로토콜 타입 감지"""
+    def _detect_protocol(self, filename: str, content: bytes) -> str:
+        """프로토콜 타입 감지 (파일명 기준 결과는 캐시됨)"""
+        protocol = self._protocol_cache.get(filename)
+        if protocol is None:
+            protocol = self._detect_protocol_uncached(filename, content)
+            self._protocol_cache[filename] = protocol
+        return protocol
+
+    def _detect_protocol_uncached(self, filename: str, content: bytes) -> str:
+        """프로토콜 타입 감지 구현
+
+        tcp_b1.log 같은 일반적인 파일명이면 내용은 전혀 보지 않고,
+        파일명이 모호할 때만 로그 내용을 검사합니다.
+        """
         filename_lower = filename.lower()
 
-        if "tcp" in filename_lower or "TCP로 서버 시작" in content:
-            return "TCP"
-        elif "udp" in filename_lower and "rudp" not in filename_lower:
-            if "UDP 서버 시작" in content:
-                return "UDP"
-        elif "rudp" in filename_lower or "RUDP" in content:
+        # 파일명 우선 ("rudp"가 "udp"에 매칭되지 않도록 순서 유지)
+        if "rudp" in filename_lower:
             return "RUDP"
-        elif "quic" in filename_lower or "QUIC" in content:
+        elif "tcp" in filename_lower:
+            return "TCP"
+        elif "udp" in filename_lower:
+            return "UDP"
+        elif "quic" in filename_lower:
             return "QUIC"
 
-        # 로그 내용으로 판단
-        if "손실 패킷:" in content and "재전송" not in content:
+        # 배너 키워드는 파일 전체가 아니라 머리부만 한 번 스캔해서 수집
+        head = content[:_HEAD_SCAN_LIMIT]
+        banners = {protocol for keyword, protocol in _BANNER_SWITCH if keyword in head}
+        for _, protocol in _BANNER_SWITCH:
+            if protocol in banners:
+                return protocol
+
+        # 로그 내용으로 판단 (content는 mmap이라 `in` 연산이 없으므로 find 사용)
+        has_lost = content.find(_KW_LOST) != -1
+        if has_lost and content.find(_KW_RESEND) == -1:
             return "UDP"
-        elif "패킷 손실률:" in content or "손실 패킷:" in content:
+        elif has_lost or content.find(_KW_LOSS_RATE) != -1:
             return "RUDP"
 
         return "UNKNOWN"
 
-    def _parse_block(self, block: str, protocol: str) -> Dict:
-        """블록에서 정보 추출"""
+    def _parse_common(self, block: bytes, protocol: str) -> Tuple[Dict, Dict]:
+        """블록 공통 필드 추출 (통합 패턴으로 한 번만 스캔)
+
+        모든 프로토콜에 공통인 record와, 프로토콜별 후처리에 쓰이는
+        패킷 카운터를 분리해서 돌려줍니다.
+        """
         record = {"protocol": protocol}
+        packets = {}
+
+        for m in _FIELDS_RE.finditer(block):
+            group = m.lastgroup
+            if group == "fname":
+                record["filename"] = m.group("fname").decode("utf-8")
+            elif group == "size_mb":
+                record["file_size_bytes"] = int(m.group("size_bytes").replace(b",", b""))
+                record["file_size_mb"] = float(m.group("size_mb"))
+            elif group == "speed":
+                record["transfer_speed"] = float(m.group("speed"))
+            elif group == "ttime":
+                record["transfer_time"] = float(m.group("ttime"))
+            elif group == "udp_expected":
+                packets["udp_received"] = int(m.group("udp_rx"))
+                packets["udp_expected"] = int(m.group("udp_expected"))
+            elif group == "expected":
+                packets["expected"] = int(m.group("expected"))
+            elif group == "received":
+                packets["received"] = int(m.group("received"))
+            elif group == "lost":
+                packets["lost"] = int(m.group("lost"))
+
+        return record, packets
+
+    def _parse_block_default(self, block: bytes, protocol: str) -> Dict:
+        """패킷 손실 정보가 없는 프로토콜용 블록 파서 (TCP/QUIC/UNKNOWN)"""
+        record, _ = self._parse_common(block, protocol)
+        return record if "transfer_speed" in record else None
 
-        # 파일명
-        filename_match = re.search(r"파일 수신 완료:\s*(\S+)", block)
-        if filename_match:
-            record["filename"] = filename_match.group(1)
+    def _parse_block_rudp(self, block: bytes, protocol: str) -> Dict:
+        """RUDP 블록 파서 (예상/수신/손실 패킷 카운터 후처리)"""
+        record, packets = self._parse_common(block, protocol)
 
-        # 파일 크기
-        size_match = re.search(
-            r"파일 크기:\s*([\d,]+)\s*bytes\s*\(([\d.]+)\s*MB\)", block
-        )
-        if size_match:
-            record["file_size_bytes"] = int(size_match.group(1).replace(",", ""))
-            record["file_size_mb"] = float(size_match.group(2))
-
-        # 전송 속도
-        speed_match = re.search(r"전송 속도:\s*([\d.]+)\s*MB/s", block)
-        if speed_match:
-            record["transfer_speed"] = float(speed_match.group(1))
-
-        # 전송 시간
-        time_match = re.search(r"순수 전송 시간:\s*([\d.]+)초", block)
-        if time_match:
-            record["transfer_time"] = float(time_match.group(1))
-
-        # RUDP 패킷 손실 정보
-        if protocol == "RUDP":
-            expected_match = re.search(r"예상 패킷:\s*(\d+)", block)
-            received_match = re.search(r"수신 패킷:\s*(\d+)", block)
-            lost_match = re.search(r"손실 패킷:\s*(\d+)", block)
-
-            if expected_match and received_match and lost_match:
-                expected = int(expected_match.group(1))
-                received = int(received_match.group(1))
-                lost = int(lost_match.group(1))
-
-                record["packets_expected"] = expected
-                record["packets_received"] = received
-                record["packets_lost"] = lost
-                record["packet_loss_rate"] = (
-                    (lost / expected * 100) if expected > 0 else 0
-                )
-
-        # UDP 손실 정보
-        elif protocol == "UDP":
-            # UDP 성공 케이스
-            expected_match = re.search(r"수신 패킷:\s*(\d+)/(\d+)", block)
-            if expected_match:
-                received = int(expected_match.group(1))
-                expected = int(expected_match.group(2))
-                record["packets_expected"] = expected
-                record["packets_received"] = received
-                record["packets_lost"] = expected - received
-                record["packet_loss_rate"] = (
-                    ((expected - received) / expected * 100) if expected > 0 else 0
-                )
+        if "expected" in packets and "received" in packets and "lost" in packets:
+            expected = packets["expected"]
+            lost = packets["lost"]
+
+            record["packets_expected"] = expected
+            record["packets_received"] = packets["received"]
+            record["packets_lost"] = lost
+            record["packet_loss_rate"] = (
+                (lost / expected * 100) if expected > 0 else 0
+            )
+
+        return record if "transfer_speed" in record else None
+
+    def _parse_block_udp(self, block: bytes, protocol: str) -> Dict:
+        """UDP 블록 파서 ("수신 패킷: n/m" 형식 후처리)"""
+        record, packets = self._parse_common(block, protocol)
+
+        # UDP 성공 케이스
+        if "udp_expected" in packets:
+            received = packets["udp_received"]
+            expected = packets["udp_expected"]
+            record["packets_expected"] = expected
+            record["packets_received"] = received
+            record["packets_lost"] = expected - received
+            record["packet_loss_rate"] = (
+                ((expected - received) / expected * 100) if expected > 0 else 0
+            )
 
         return record if "transfer_speed" in record else None
 
     def analyze_by_protocol(self, records: List[Dict]) -> Dict:
         """프로토콜별 통계 분석"""
+        # 레코드를 한 번만 순회하며 프로토콜별 컬럼(속도/손실률)으로 분리해 두면
+        # 이후 집계가 필드별 dict 조회 없이 리스트 단위로 이루어진다
         protocol_stats = defaultdict(list)
+        protocol_speeds = defaultdict(list)
+        protocol_losses = defaultdict(list)
 
         for record in records:
             protocol = record["protocol"]
             protocol_stats[protocol].append(record)
+            protocol_speeds[protocol].append(record["transfer_speed"])
+            if "packet_loss_rate" in record:
+                protocol_losses[protocol].append(record["packet_loss_rate"])
 
         results = {}
         for protocol, data in protocol_stats.items():
-            speeds = [r["transfer_speed"] for r in data]
-            loss_rates = [
-                r.get("packet_loss_rate", 0) for r in data if "packet_loss_rate" in r
-            ]
+            speeds = protocol_speeds[protocol]
+            loss_rates = protocol_losses[protocol]
+
+            avg_speed, min_speed, max_speed, std_dev_speed = _speed_stats(speeds)
 
             results[protocol] = {
                 "count": len(data),
-                "avg_speed": statistics.mean(speeds),
-                "min_speed": min(speeds),
-                "max_speed": max(speeds),
-                "std_dev_speed": statistics.stdev(speeds) if len(speeds) > 1 else 0,
-                "avg_loss_rate": statistics.mean(loss_rates) if loss_rates else 0,
+                "avg_speed": avg_speed,
+                "min_speed": min_speed,
+                "max_speed": max_speed,
+                "std_dev_speed": std_dev_speed,
+                "avg_loss_rate": _mean(loss_rates) if loss_rates else 0,
                 "records": data,
             }
 
@@ -183,23 +321,30 @@ class ServerLogAnalyzer:
         ]
         fields = [f for f in fields if f in all_fields]
 
-        with open(output_file, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
-            writer.writeheader()
-            writer.writerows(records)
+        # pandas가 있으면 C 구현 직렬화로 한 번에 기록
+        try:
+            import pandas as pd
+
+            pd.DataFrame(records).reindex(columns=fields).to_csv(
+                output_file, index=False, encoding="utf-8"
+            )
+        except ImportError:
+            with open(output_file, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+                writer.writeheader()
+                writer.writerows(records)
 
         print(f"CSV 파일 생성: {output_file}")
 
     def print_summary(self, results: Dict):
-        """결과 요약 출력"""
-        print(f"\n{'='*80}")
-        print(f"{'서버 로그 분석 결과':^80}")
-        print(f"{'='*80}\n")
-
-        print(
-            f"{'프로토콜':<12} {'전송 횟수':<12} {'평균 속도':<15} {'최소/최대':<20} {'평균 손실률':<15}"
-        )
-        print(f"{'-'*80}")
+        """결과 요약 출력 (행 단위 print 대신 표 전체를 한 번에 write)"""
+        rows = [
+            f"\n{'='*80}",
+            f"{'서버 로그 분석 결과':^80}",
+            f"{'='*80}\n",
+            f"{'프로토콜':<12} {'전송 횟수':<12} {'평균 속도':<15} {'최소/최대':<20} {'평균 손실률':<15}",
+            f"{'-'*80}",
+        ]
 
         for protocol in sorted(results.keys()):
             stats = results[protocol]
@@ -207,14 +352,33 @@ class ServerLogAnalyzer:
                 f"{stats['avg_loss_rate']:.2f}%" if stats["avg_loss_rate"] > 0 else "-"
             )
 
-            print(
+            rows.append(
                 f"{protocol:<12} {stats['count']:<12} "
                 f"{stats['avg_speed']:>6.2f} MB/s   "
                 f"{stats['min_speed']:>6.2f} / {stats['max_speed']:>6.2f}     "
                 f"{loss_str:<15}"
             )
 
-        print(f"{'-'*80}\n")
+        rows.append(f"{'-'*80}\n")
+        sys.stdout.write("\n".join(rows) + "\n")
+
+
+# 워커 프로세스마다 분석기를 하나만 만들어 재사용한다.
+# (정규식은 모듈 import 시 컴파일되므로 워커당 한 번만 비용을 치르고,
+# 프로토콜 감지 캐시도 같은 워커가 처리하는 파일들 사이에 공유된다)
+_WORKER_ANALYZER = None
+
+
+def _init_worker():
+    """ProcessPoolExecutor 워커 초기화: 분석기 인스턴스를 한 번만 생성"""
+    global _WORKER_ANALYZER
+    _WORKER_ANALYZER = ServerLogAnalyzer()
+
+
+def _parse_log_file(log_file: str) -> List[Dict]:
+    """워커 프로세스에서 로그 파일 하나를 파싱 (ProcessPoolExecutor용)"""
+    analyzer = _WORKER_ANALYZER if _WORKER_ANALYZER is not None else ServerLogAnalyzer()
+    return analyzer.parse_log_file(log_file)
 
 
 def main():
@@ -249,14 +413,22 @@ def main():
     analyzer = ServerLogAnalyzer()
     all_records = []
 
-    # 모든 로그 파일 처리
+    existing_files = []
     for log_file in args.log_files:
         if not Path(log_file).exists():
             print(f"경고: 파일을 찾을 수 없습니다: {log_file}")
             continue
+        existing_files.append(log_file)
 
+    # 모든 로그 파일 처리 (파일별 파싱은 독립적이므로 여러 개면 병렬 처리)
+    if len(existing_files) > 1:
+        with ProcessPoolExecutor(initializer=_init_worker) as executor:
+            per_file_records = list(executor.map(_parse_log_file, existing_files))
+    else:
+        per_file_records = [analyzer.parse_log_file(f) for f in existing_files]
+
+    for log_file, records in zip(existing_files, per_file_records):
         print(f"분석 중: {log_file}")
-        records = analyzer.parse_log_file(log_file)
         all_records.extend(records)
         print(f"  → {len(records)}개 전송 기록 발견")
 
@@ -277,13 +449,24 @@ def main():
 
     # JSON 내보내기
     if args.json:
+        # 레코드는 최상위 "records"에만 싣는다. 프로토콜별 stats에 포함된
+        # records까지 직렬화하면 모든 레코드가 두 번씩 기록된다.
+        protocol_stats = {
+            protocol: {k: v for k, v in stats.items() if k != "records"}
+            for protocol, stats in results.items()
+        }
         output_data = {
             "total_records": len(all_records),
-            "protocol_stats": results,
+            "protocol_stats": protocol_stats,
             "records": all_records,
         }
-        with open(args.json, "w", encoding="utf-8") as f:
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
+        # orjson이 있으면 C 구현 직렬화로 UTF-8 바이트를 한 번에 기록
+        if orjson is not None:
+            with open(args.json, "wb") as f:
+                f.write(orjson.dumps(output_data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(output_data, f, indent=2, ensure_ascii=False)
         print(f"JSON 파일 생성: {args.json}")
 
 
@@ -10,24 +10,121 @@
 """
 
 import re
+import mmap
 import sys
 import argparse
 from pathlib import Path
 from typing import Dict, List, Tuple
-from collections import defaultdict
-import statistics
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 반복 사용되는 패턴은 모듈 로드 시 한 번만 컴파일.
+# 로그 내용은 mmap으로 직접 스캔하므로 바이트 패턴을 사용한다.
+_BUFFER_NAME_RE = re.compile(r"[_\-]?b(?:uffer)?[_\-]?(\d+)")
+
+# 속도/손실 필드를 한 번의 스캔으로 모두 추출하는 통합 패턴.
+# finditer + lastgroup으로 필드를 구분한다.
+_BUF_SCAN_RE = re.compile(
+    (
+        r"전송 속도:\s*(?P<speed>[\d.]+)\s*MB/s"
+        r"|예상 패킷:\s*(?P<expected>\d+).*?손실 패킷:\s*(?P<lost>\d+)"
+        r"|수신 패킷:\s*(?P<udp_rx>\d+)/(?P<udp_expected>\d+)"
+    ).encode(),
+    re.DOTALL,
+)
+
+
+def _speed_stats(values: List[float]) -> Tuple[float, float, float, float]:
+    """(평균, 최소, 최대, 표준편차) 계산. numpy가 있으면 벡터 연산 사용
+
+    numpy가 없으면 Welford 알고리즘으로 한 번의 순회에 네 값을 모두 구한다.
+    (statistics.stdev는 내부적으로 두 번 순회하며 고정밀 연산을 사용)
+    """
+    if np is not None:
+        arr = np.asarray(values, dtype=np.float64)
+        std_dev = float(arr.std(ddof=1)) if arr.size > 1 else 0.0
+        return float(arr.mean()), float(arr.min()), float(arr.max()), std_dev
+
+    n = 0
+    mean = 0.0
+    s = 0.0
+    low = high = values[0]
+    for x in values:
+        n += 1
+        delta = x - mean
+        mean += delta / n
+        s += delta * (x - mean)
+        if x < low:
+            low = x
+        elif x > high:
+            high = x
+    std_dev = (s / (n - 1)) ** 0.5 if n > 1 else 0.0
+    return mean, low, high, std_dev
+
+
+def _scan_log_file(log_file: str) -> Tuple[str, int, list, list]:
+    """로그 파일 하나를 스캔하여 (프로토콜, 버퍼 크기, 속도, 손실률) 반환
+
+    상태를 변경하지 않는 순수 함수이므로 ProcessPoolExecutor 워커로
+    그대로 사용할 수 있습니다.
+    """
+    protocol, buffer_size = BufferSizeComparison.parse_log_file(log_file)
+
+    if not protocol or buffer_size is None:
+        return protocol, buffer_size, [], []
+
+    speeds = []
+    loss_rates = []
+
+    # 파일 전체를 str로 디코딩하지 않고 mmap 위에서 바이트 패턴으로 스캔
+    with open(log_file, "rb") as f:
+        if Path(log_file).stat().st_size == 0:
+            content = b""
+        else:
+            content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # 속도와 손실 정보를 한 번의 스캔으로 추출
+        track_loss = protocol in ["RUDP", "UDP"]
+        for m in _BUF_SCAN_RE.finditer(content):
+            group = m.lastgroup
+            if group == "speed":
+                speeds.append(float(m.group("speed")))
+            elif group == "lost" and track_loss:
+                # RUDP 패킷 손실
+                expected = int(m.group("expected"))
+                lost = int(m.group("lost"))
+                if expected > 0:
+                    loss_rates.append((lost / expected) * 100)
+            elif group == "udp_expected" and protocol == "UDP":
+                # UDP 성공 케이스
+                received = int(m.group("udp_rx"))
+                expected = int(m.group("udp_expected"))
+                if expected > 0:
+                    loss_rates.append(((expected - received) / expected) * 100)
+
+        if content:
+            content.close()
+
+    return protocol, buffer_size, speeds, loss_rates
 
 
 class BufferSizeComparison:
     """버퍼 크기별 성능 비교"""
 
     def __init__(self):
-        self.data = defaultdict(lambda: defaultdict(list))
-        # data[protocol][buffer_size] = [speeds]
-        self.loss_data = defaultdict(lambda: defaultdict(list))
-        # loss_data[protocol][buffer_size] = [loss_rates]
-
-    def parse_log_file(self, log_file: str) -> Tuple[str, int]:
+        # (protocol, buffer_size) 튜플 키의 평탄한 dict.
+        # 중첩 defaultdict보다 조회가 한 번으로 끝난다.
+        self.data = {}
+        # data[(protocol, buffer_size)] = [speeds]
+        self.loss_data = {}
+        # loss_data[(protocol, buffer_size)] = [loss_rates]
+
+    @staticmethod
+    def parse_log_file(log_file: str) -> Tuple[str, int]:
         """로그 파일에서 프로토콜과 버퍼 크기 추출"""
         filename = Path(log_file).name
 
@@ -46,7 +143,7 @@ class BufferSizeComparison:
                 break
 
         # 버퍼 크기 추출
-        buffer_match = re.search(r"[_\-]?b(?:uffer)?[_\-]?(\d+)", filename.lower())
+        buffer_match = _BUFFER_NAME_RE.search(filename.lower())
         if buffer_match:
             buffer_size = int(buffer_match.group(1))
 
@@ -54,47 +151,27 @@ class BufferSizeComparison:
 
     def extract_stats(self, log_file: str):
         """로그 파일에서 통계 추출"""
-        protocol, buffer_size = self.parse_log_file(log_file)
+        self.add_stats(log_file, _scan_log_file(log_file))
+
+    def add_stats(self, log_file: str, scanned: Tuple[str, int, list, list]):
+        """스캔 결과를 내부 통계에 병합"""
+        protocol, buffer_size, speeds, loss_rates = scanned
 
         if not protocol or buffer_size is None:
             print(f"경고: {log_file}에서 프로토콜 또는 버퍼 크기를 감지할 수 없습니다.")
             return
 
-        with open(log_file, "r", encoding="utf-8") as f:
-            content = f.read()
-
-        # 전송 속도 추출
-        speeds = re.findall(r"전송 속도:\s*([\d.]+)\s*MB/s", content)
-        speeds = [float(s) for s in speeds]
-
+        key = (protocol, buffer_size)
         if speeds:
-            self.data[protocol][buffer_size].extend(speeds)
-
-        # 손실률 추출
-        if protocol in ["RUDP", "UDP"]:
-            # RUDP 패킷 손실
-            loss_blocks = re.findall(
-                r"예상 패킷:\s*(\d+).*?수신 패킷:\s*(\d+).*?손실 패킷:\s*(\d+)",
-                content,
-                re.DOTALL,
-            )
-
-            for expected, received, lost in loss_blocks:
-                expected = int(expected)
-                lost = int(lost)
-                if expected > 0:
-                    loss_rate = (lost / expected) * 100
-                    self.loss_data[protocol][buffer_size].append(loss_rate)
-
-            # UDP 성공 케이스
-            if protocol == "UDP":
-                udp_loss = re.findall(r"수신 패킷:\s*(\d+)/(\d+)", content)
-                for received, expected in udp_loss:
-                    received = int(received)
-                    expected = int(expected)
-                    if expected > 0:
-                        loss_rate = ((expected - received) / expected) * 100
-                        self.loss_data[protocol][buffer_size].append(loss_rate)
+            bucket = self.data.get(key)
+            if bucket is None:
+                bucket = self.data[key] = []
+            bucket.extend(speeds)
+        if loss_rates:
+            bucket = self.loss_data.get(key)
+            if bucket is None:
+                bucket = self.loss_data[key] = []
+            bucket.extend(loss_rates)
 
         print(
             f"처리 완료: {log_file} → {protocol}, 버퍼 크기={buffer_size}, {len(speeds)}개 기록"
@@ -104,39 +181,40 @@ class BufferSizeComparison:
         """통계 계산"""
         results = {}
 
-        for protocol in self.data:
-            results[protocol] = {}
-
-            for buffer_size in sorted(self.data[protocol].keys()):
-                speeds = self.data[protocol][buffer_size]
-                losses = self.loss_data[protocol].get(buffer_size, [])
-
-                stats = {
-                    "count": len(speeds),
-                    "avg_speed": statistics.mean(speeds),
-                    "min_speed": min(speeds),
-                    "max_speed": max(speeds),
-                    "std_dev": statistics.stdev(speeds) if len(speeds) > 1 else 0,
-                }
-
-                if losses:
-                    stats["avg_loss"] = statistics.mean(losses)
-                    stats["min_loss"] = min(losses)
-                    stats["max_loss"] = max(losses)
-                else:
-                    stats["avg_loss"] = 0
-                    stats["min_loss"] = 0
-                    stats["max_loss"] = 0
+        for (protocol, buffer_size), speeds in sorted(self.data.items()):
+            losses = self.loss_data.get((protocol, buffer_size), [])
+
+            avg_speed, min_speed, max_speed, std_dev = _speed_stats(speeds)
+
+            stats = {
+                "count": len(speeds),
+                "avg_speed": avg_speed,
+                "min_speed": min_speed,
+                "max_speed": max_speed,
+                "std_dev": std_dev,
+            }
 
-                results[protocol][buffer_size] = stats
+            if losses:
+                avg_loss, min_loss, max_loss, _ = _speed_stats(losses)
+                stats["avg_loss"] = avg_loss
+                stats["min_loss"] = min_loss
+                stats["max_loss"] = max_loss
+            else:
+                stats["avg_loss"] = 0
+                stats["min_loss"] = 0
+                stats["max_loss"] = 0
+
+            results.setdefault(protocol, {})[buffer_size] = stats
 
         return results
 
     def print_comparison(self, results: Dict):
-        """비교 결과 출력"""
-        print(f"\n{'='*100}")
-        print(f"{'버퍼 크기별 프로토콜 성능 비교':^100}")
-        print(f"{'='*100}\n")
+        """비교 결과 출력
+
+        행마다 print하지 않고 전체 표를 리스트로 만든 뒤
+        한 번의 write로 출력합니다.
+        """
+        rows = [f"\n{'='*100}", f"{'버퍼 크기별 프로토콜 성능 비교':^100}", f"{'='*100}\n"]
 
         # 모든 버퍼 크기 수집
         all_buffer_sizes = set()
@@ -147,51 +225,49 @@ class BufferSizeComparison:
         protocols = sorted(results.keys())
 
         # 전송 속도 비교
-        print(f"【전송 속도 (MB/s)】\n")
-        print(f"{'버퍼':<8}", end="")
-        for protocol in protocols:
-            print(f"{protocol:>12}", end="")
-        print()
-        print(f"{'-'*100}")
+        rows.append("【전송 속도 (MB/s)】\n")
+        rows.append(
+            f"{'버퍼':<8}" + "".join(f"{protocol:>12}" for protocol in protocols)
+        )
+        rows.append(f"{'-'*100}")
 
         for buffer_size in buffer_sizes:
-            print(f"{buffer_size:<8}", end="")
+            cells = [f"{buffer_size:<8}"]
             for protocol in protocols:
                 if buffer_size in results[protocol]:
                     stats = results[protocol][buffer_size]
-                    print(f"{stats['avg_speed']:>10.2f}  ", end="")
+                    cells.append(f"{stats['avg_speed']:>10.2f}  ")
                 else:
-                    print(f"{'N/A':>12}", end="")
-            print()
+                    cells.append(f"{'N/A':>12}")
+            rows.append("".join(cells))
 
         # 손실률 비교 (RUDP, UDP만)
         loss_protocols = [p for p in protocols if p in ["RUDP", "UDP"]]
         if loss_protocols:
-            print(f"\n{'='*100}")
-            print(f"【패킷 손실률 (%)】\n")
-            print(f"{'버퍼':<8}", end="")
-            for protocol in loss_protocols:
-                print(f"{protocol:>12}", end="")
-            print()
-            print(f"{'-'*100}")
+            rows.append(f"\n{'='*100}")
+            rows.append("【패킷 손실률 (%)】\n")
+            rows.append(
+                f"{'버퍼':<8}" + "".join(f"{protocol:>12}" for protocol in loss_protocols)
+            )
+            rows.append(f"{'-'*100}")
 
             for buffer_size in buffer_sizes:
-                print(f"{buffer_size:<8}", end="")
+                cells = [f"{buffer_size:<8}"]
                 for protocol in loss_protocols:
                     if buffer_size in results[protocol]:
                         stats = results[protocol][buffer_size]
                         if stats["avg_loss"] > 0:
-                            print(f"{stats['avg_loss']:>10.2f}  ", end="")
+                            cells.append(f"{stats['avg_loss']:>10.2f}  ")
                         else:
-                            print(f"{'0.00':>12}", end="")
+                            cells.append(f"{'0.00':>12}")
                     else:
-                        print(f"{'N/A':>12}", end="")
-                print()
+                        cells.append(f"{'N/A':>12}")
+                rows.append("".join(cells))
 
-        print(f"\n{'='*100}\n")
+        rows.append(f"\n{'='*100}\n")
 
         # 최적 버퍼 크기 추천
-        print("【권장사항】\n")
+        rows.append("【권장사항】\n")
         for protocol in protocols:
             if not results[protocol]:
                 continue
@@ -201,14 +277,16 @@ class BufferSizeComparison:
                 results[protocol].items(), key=lambda x: x[1]["avg_speed"]
             )
 
-            print(
+            rows.append(
                 f"• {protocol}: 버퍼 크기 {best_buffer[0]} "
                 f"(평균 {best_buffer[1]['avg_speed']:.2f} MB/s"
             )
 
             if protocol in ["RUDP", "UDP"] and best_buffer[1]["avg_loss"] > 0:
-                print(f"  └ 평균 손실률: {best_buffer[1]['avg_loss']:.2f}%")
-            print()
+                rows.append(f"  └ 평균 손실률: {best_buffer[1]['avg_loss']:.2f}%")
+            rows.append("")
+
+        sys.stdout.write("\n".join(rows) + "\n")
 
     def export_csv(self, results: Dict, output_file: str):
         """CSV 파일로 내보내기"""
@@ -342,13 +420,23 @@ def main():
 
     comparison = BufferSizeComparison()
 
-    # 로그 파일 처리
+    existing_files = []
     for log_file in args.log_files:
         if not Path(log_file).exists():
             print(f"경고: 파일을 찾을 수 없습니다: {log_file}")
             continue
-
-        comparison.extract_stats(log_file)
+        existing_files.append(log_file)
+
+    # 로그 파일 처리 (파일별 스캔은 독립적이므로 여러 개면 병렬 처리)
+    if len(existing_files) > 1:
+        with ProcessPoolExecutor() as executor:
+            for log_file, scanned in zip(
+                existing_files, executor.map(_scan_log_file, existing_files)
+            ):
+                comparison.add_stats(log_file, scanned)
+    else:
+        for log_file in existing_files:
+            comparison.extract_stats(log_file)
 
     # 통계 계산
     results = comparison.calculate_stats()
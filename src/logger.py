@@ -99,6 +99,14 @@ class Logger:
         """타임스탬프 포함 여부 설정"""
         self.include_timestamp = enabled
 
+    def is_enabled_for(self, level: LogLevel) -> bool:
+        """
+        해당 레벨의 로그가 실제로 기록되는지 여부 반환
+
+        핫 패스에서 비싼 메시지 포맷팅을 하기 전에 미리 확인하는 용도입니다.
+        """
+        return self.enabled and level.value >= self.min_level.value
+
     def log(self, level: LogLevel, message: str) -> None:
         """
         지정된 레벨로 메시지 로깅
@@ -159,6 +167,11 @@ def get_logger() -> Logger:
 
 
 # 편의성을 위한 함수들
+def is_enabled_for(level: LogLevel) -> bool:
+    """해당 레벨의 로그가 실제로 기록되는지 여부 반환"""
+    return get_logger().is_enabled_for(level)
+
+
 def debug(message: str) -> None:
     """디버그 레벨 로그"""
     get_logger().debug(message)
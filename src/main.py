@@ -1,23 +1,99 @@
 import argparse
 import datetime
+import math
+import os
+import sys
 import time
 
 from protocol import Protocol
-from rudp import RUDP
+from rudp import REDUNDANCY_SIZE, RUDP
 import logger
 from tcp import TCP
 from udp import UDP
+from utils import json_dumps
 
-try:
-    from quic import QUIC
-
-    QUIC_AVAILABLE = True
-except ImportError:
-    QUIC_AVAILABLE = False
+# quic 모듈은 aioquic이 없어도 import되고, 설치 여부는
+# QUIC_AVAILABLE 플래그로 알려 준다
+from quic import QUIC, QUIC_AVAILABLE
 
 KB = 1024
 
 
+def resolve_buffer_size(protocol_name: str, coef: int) -> int:
+    """버퍼 크기 계수를 프로토콜별 실제 버퍼 크기(바이트)로 바꿉니다."""
+    if protocol_name == "rudp":
+        return 1460 + (coef - 1) * RUDP.MSS
+    if protocol_name == "tcp":
+        return coef * TCP.MSS
+    if protocol_name == "udp":
+        return coef * UDP.MSS
+    if protocol_name == "quic":
+        return coef * QUIC.MSS
+    raise ValueError(
+        "Invalid protocol. Please choose 'rudp', 'tcp', 'udp', or 'quic'."
+    )
+
+
+def run_worker(protocol: Protocol, protocol_name: str):
+    """
+    표준입력에서 SEND 명령을 읽어 전송을 반복 수행하는 상주 모드입니다.
+
+    테스트 하네스가 반복마다 인터프리터를 새로 띄우지 않아도 되도록
+    한 프로세스가 여러 전송을 처리하고, 전송마다 결과를 한 줄짜리
+    JSON으로 표준출력에 내보냅니다.
+
+    명령 형식: SEND <파일> <호스트> <포트> <버퍼계수> <간격> [배치크기]
+    """
+    # 프로토콜 로그가 JSON 응답 줄과 섞이지 않도록 콘솔 출력을 끈다
+    logger.get_logger().set_console_output(False)
+
+    # 진행률처럼 sys.stdout에 직접 쓰는 출력도 응답 스트림을 오염시키므로
+    # 응답용 스트림을 따로 잡아 두고 stdout은 devnull로 돌린다
+    out = sys.stdout.buffer
+    sys.stdout = open(os.devnull, "w")
+
+    for line in sys.stdin:
+        parts = line.split()
+        if len(parts) < 6 or parts[0] != "SEND":
+            continue
+        w_file, w_host, w_port, w_coef, w_interval = parts[1:6]
+        if len(parts) >= 7:
+            protocol.batch_size = int(parts[6])
+        response = {"success": False, "speed": None, "packet_loss": None}
+        try:
+            size = os.path.getsize(w_file)
+            w_buffer_size = resolve_buffer_size(protocol_name, int(w_coef))
+            start = time.perf_counter()
+            result = protocol.send_file(
+                w_file,
+                host=w_host,
+                port=int(w_port),
+                buffer_size=w_buffer_size,
+                interval=float(w_interval),
+            )
+            elapsed = time.perf_counter() - start
+
+            if result is not False and elapsed > 0:
+                response["success"] = True
+                response["speed"] = size / elapsed / 1024 / 1024
+
+            if isinstance(result, list):
+                # RUDP는 ACK 라운드별 손실 seq 목록을 반환한다
+                if result and result[-1] == [-1]:
+                    response["success"] = False
+                lost = sum(len(l) for l in result if l and l[0] != -1)
+                total_chunks = math.ceil(size / (w_buffer_size - REDUNDANCY_SIZE))
+                total_sent = total_chunks + lost
+                response["packet_loss"] = (
+                    lost / total_sent * 100 if total_sent else 0.0
+                )
+        except Exception as e:
+            response["error"] = str(e)
+
+        out.write(json_dumps(response) + b"\n")
+        out.flush()
+
+
 def program(
     filename: str,
     host: str = "localhost",
@@ -38,42 +114,37 @@ def program(
     str_time_now = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 
     log_name = (
-        str_time_now
-        + "itvl"
-        + str(start_interval)
-        + "-"
-        + str(end_interval)
-        + "bfr"
-        + str(start_buffer_size_coef)
-        + "-"
-        + str(end_buffer_size_coef)
+        f"{str_time_now}itvl{start_interval}-{end_interval}"
+        f"bfr{start_buffer_size_coef}-{end_buffer_size_coef}"
     )
-    with open(log_name, "w", encoding="utf-8") as file:
+    # 전송 사이에 로그를 한 줄씩 쓰지 않도록 큰 쓰기 버퍼를 사용
+    with open(log_name, "w", encoding="utf-8", buffering=1 << 20) as file:
         file.write(f"{log_name}\n")
         while interval <= end_interval:
             buffer_size_coef = start_buffer_size_coef
             while buffer_size_coef <= end_buffer_size_coef:
-                file.write(
-                    f"Buffer Size : {buffer_size_coef}\t Interval : {interval}\n"
-                )
+                lines = [f"Buffer Size : {buffer_size_coef}\t Interval : {interval}\n"]
                 for i in range(iterate_num):
                     losses = _protocol.send_file(
                         filename, host, port, 1024 * buffer_size_coef, interval
                     )
                     time.sleep(5)
-                    file.write(f"Iteration : {i + 1}\n")
+                    # 손실 기록은 모았다가 반복이 끝날 때 한 번에 기록
+                    lines.append(f"Iteration : {i + 1}\n")
                     for loss in losses:
                         volume_lossed = len(loss) * buffer_size_coef * 4
-                        file.write(f"LOSS : {volume_lossed}\n")
-                        file.write(f"{loss}\n")
-                    file.write("\n")
+                        lines.append(f"LOSS : {volume_lossed}\n")
+                        lines.append(f"{loss}\n")
+                    lines.append("\n")
 
+                file.write("".join(lines))
                 buffer_size_coef *= 2
 
-        interval += interval_of_interval
-    file.write("\n")
-    end_time = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    file.write(f"end : {end_time}\n")
+            interval += interval_of_interval
+
+        file.write("\n")
+        end_time = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        file.write(f"end : {end_time}\n")
 
 
 if __name__ == "__main__":
@@ -87,7 +158,12 @@ if __name__ == "__main__":
     parser.add_argument("-d", "--developer", type=bool, default=False)
     parser.add_argument("-i", "--interval", type=float, default=0.0001)
     parser.add_argument("-l", "--log", type=str, default="")
+    parser.add_argument("-w", "--worker", type=bool, default=False)
     parser.add_argument("--protocol", type=str, default="rudp")
+    # 전송 튜닝 노브 (0이면 프로토콜 기본값)
+    parser.add_argument("--batch_size", type=int, default=0)
+    parser.add_argument("--so_sndbuf", type=int, default=0)
+    parser.add_argument("--so_rcvbuf", type=int, default=0)
 
     args = parser.parse_args()
 
@@ -106,28 +182,30 @@ if __name__ == "__main__":
     if arg_logger:
         logger.get_logger().start_file_logging(arg_logger)
 
+    if arg_protocol == "quic" and not QUIC_AVAILABLE:
+        logger.error(
+            "QUIC 프로토콜을 사용하려면 aioquic와 cryptography 라이브러리를 설치해야 합니다."
+        )
+        logger.error("설치 명령어: pip install aioquic cryptography")
+        exit(1)
+
+    buffer_size = resolve_buffer_size(arg_protocol, arg_buffer_size)
     if arg_protocol == "rudp":
-        buffer_size = 1460 + (arg_buffer_size - 1) * RUDP.MSS
         protocol = RUDP()
     elif arg_protocol == "tcp":
-        buffer_size = arg_buffer_size * TCP.MSS
         protocol = TCP()
     elif arg_protocol == "udp":
-        buffer_size = arg_buffer_size * UDP.MSS
         protocol = UDP()
-    elif arg_protocol == "quic":
-        if not QUIC_AVAILABLE:
-            logger.error(
-                "QUIC 프로토콜을 사용하려면 aioquic와 cryptography 라이브러리를 설치해야 합니다."
-            )
-            logger.error("설치 명령어: pip install aioquic cryptography")
-            exit(1)
-        buffer_size = arg_buffer_size * QUIC.MSS
-        protocol = QUIC()
     else:
-        raise ValueError(
-            "Invalid protocol. Please choose 'rudp', 'tcp', 'udp', or 'quic'."
-        )
+        protocol = QUIC()
+
+    protocol.batch_size = args.batch_size
+    protocol.so_sndbuf = args.so_sndbuf
+    protocol.so_rcvbuf = args.so_rcvbuf
+
+    if args.worker:
+        run_worker(protocol, arg_protocol)
+        sys.exit(0)
 
     if arg_is_developer:
         program(arg_file_name, host=arg_host, port=arg_port)
@@ -3,6 +3,11 @@ BUFFER_SIZE = 1024 * 1024 * 1024
 
 class Protocol:
 
+    # 전송 튜닝 노브 (0이면 프로토콜별 기본값 사용)
+    batch_size = 0  # sendmmsg 묶음 크기
+    so_sndbuf = 0  # SO_SNDBUF 크기 (bytes)
+    so_rcvbuf = 0  # SO_RCVBUF 크기 (bytes)
+
     def send_file(
         self, filename: str, host: str, port: int, buffer_size: int, interval: float
     ): ...
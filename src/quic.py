@@ -1,7 +1,10 @@
 import asyncio
 import os
+import socket
+import struct
 import time
 import ssl
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Optional
 
@@ -15,9 +18,36 @@ try:
 except ImportError:
     QUIC_AVAILABLE = False
 
+    # aioquic이 없어도 모듈 import 자체는 가능해야 하므로
+    # (사용 가능 여부는 QUIC_AVAILABLE 플래그로 전달한다)
+    # 클래스 정의에 필요한 이름들을 대체해 둔다.
+    QuicConnectionProtocol = object
+    QuicEvent = StreamDataReceived = HandshakeCompleted = None
+
 from protocol import Protocol
 import logger
 
+# 사용자 공간 QUIC은 커널 기본 UDP 버퍼로는 버스트를 다 비우지 못해
+# 패킷이 드롭되기 쉬우므로 송수신 버퍼를 넉넉하게 잡는다.
+# (커널이 net.core.rmem_max / wmem_max 로 상한을 둘 수 있으니
+# 더 키우려면 sysctl -w net.core.rmem_max=... 도 함께 조정할 것)
+_UDP_BUFFER_SIZE = 16 * 1024 * 1024
+
+# 파일 헤더 포맷 (8바이트 파일크기 + 256바이트 파일명, NUL 패딩)
+_FHDR = struct.Struct("!Q256s")
+
+
+def _tune_udp_socket(transport):
+    """QUIC이 쓰는 UDP 소켓의 SO_RCVBUF / SO_SNDBUF를 키웁니다."""
+    sock = transport.get_extra_info("socket") if transport is not None else None
+    if sock is None:
+        return
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, _UDP_BUFFER_SIZE)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, _UDP_BUFFER_SIZE)
+    rcvbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+    sndbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+    logger.info(f"UDP 소켓 버퍼 설정: SO_RCVBUF={rcvbuf:,}, SO_SNDBUF={sndbuf:,}")
+
 
 class QuicFileClientProtocol(QuicConnectionProtocol):
     """QUIC 파일 전송 클라이언트 프로토콜"""
@@ -28,22 +58,39 @@ class QuicFileClientProtocol(QuicConnectionProtocol):
         self.filename = None
         self.response_received = asyncio.Event()
         self.response_data = b""
+        self._response_chunks = []
 
     def quic_event_received(self, event: QuicEvent):
         if isinstance(event, StreamDataReceived):
-            # 서버로부터의 응답 수신
-            self.response_data += event.data
+            # 서버로부터의 응답 수신 (+= 연결은 O(N^2) 복사가 되므로
+            # 조각을 모았다가 스트림이 끝날 때 한 번에 합친다)
+            self._response_chunks.append(event.data)
             if event.end_stream:
+                self.response_data = b"".join(self._response_chunks)
                 self.response_received.set()
 
 
+@dataclass(slots=True)
+class StreamState:
+    """스트림 하나의 수신 상태 (dict보다 빠른 슬롯 기반 속성 접근)"""
+
+    data: bytearray = field(default_factory=bytearray)
+    filename: Optional[str] = None
+    filesize: Optional[int] = None
+    start_time: float = 0.0
+    header_parsed: bool = False
+    fp: Optional[object] = None
+    filepath: Optional[str] = None
+    received: int = 0
+
+
 class QuicFileServerProtocol(QuicConnectionProtocol):
     """QUIC 파일 수신 서버 프로토콜"""
 
     def __init__(self, *args, target_dir: str = "received", **kwargs):
         super().__init__(*args, **kwargs)
         self.target_dir = target_dir
-        self.streams = {}  # stream_id -> {data, filename, filesize, start_time}
+        self.streams = {}  # stream_id -> StreamState
 
     def quic_event_received(self, event: QuicEvent):
         if isinstance(event, HandshakeCompleted):
@@ -54,60 +101,66 @@ class QuicFileServerProtocol(QuicConnectionProtocol):
 
             # 새로운 스트림 초기화
             if stream_id not in self.streams:
-                self.streams[stream_id] = {
-                    "data": bytearray(),
-                    "filename": None,
-                    "filesize": None,
-                    "start_time": time.time(),
-                    "header_parsed": False,
-                }
+                self.streams[stream_id] = StreamState(start_time=time.time())
 
             stream_info = self.streams[stream_id]
-            stream_info["data"].extend(event.data)
 
-            # 헤더 파싱 (처음 256바이트에 파일명과 크기 정보)
-            if not stream_info["header_parsed"] and len(stream_info["data"]) >= 264:
-                import struct
-
-                filesize = struct.unpack("!Q", bytes(stream_info["data"][:8]))[0]
-                filename = (
-                    bytes(stream_info["data"][8:264]).decode("utf-8").strip("\x00")
-                )
-
-                stream_info["filename"] = filename
-                stream_info["filesize"] = filesize
-                stream_info["header_parsed"] = True
-                stream_info["data"] = bytearray(stream_info["data"][264:])  # 헤더 제거
-
-                logger.info(f"파일 수신 시작: {filename} (크기: {filesize:,} bytes)")
-
-            # 스트림 종료 시 파일 저장
-            if event.end_stream and stream_info["header_parsed"]:
+            if stream_info.header_parsed:
+                # 헤더 이후의 데이터는 메모리에 쌓지 않고 그대로 디스크에 쓴다
+                stream_info.fp.write(event.data)
+                stream_info.received += len(event.data)
+            else:
+                stream_info.data.extend(event.data)
+
+                # 헤더 파싱 (처음 256바이트에 파일명과 크기 정보)
+                if len(stream_info.data) >= _FHDR.size:
+                    filesize, raw_name = _FHDR.unpack_from(stream_info.data, 0)
+                    # 패딩 제거는 바이트 단계에서 끝내고 짧아진 결과만 디코딩
+                    filename = raw_name.rstrip(b"\x00").decode("utf-8")
+
+                    stream_info.filename = filename
+                    stream_info.filesize = filesize
+                    stream_info.header_parsed = True
+                    # 헤더 제거: 새 bytearray를 할당해 본문 전체를 복사하는 대신
+                    # 제자리에서 앞 264바이트만 잘라낸다
+                    del stream_info.data[: _FHDR.size]
+
+                    # 수신 파일을 바로 열어 헤더 뒤에 남은 본문부터 기록 시작
+                    Path(self.target_dir).mkdir(parents=True, exist_ok=True)
+                    filepath = os.path.join(self.target_dir, filename)
+                    stream_info.filepath = filepath
+                    stream_info.fp = open(filepath, "wb")
+                    if stream_info.data:
+                        stream_info.fp.write(stream_info.data)
+                        stream_info.received = len(stream_info.data)
+                    stream_info.data = bytearray()
+
+                    logger.info(
+                        f"파일 수신 시작: {filename} (크기: {filesize:,} bytes)"
+                    )
+
+            # 스트림 종료 시 파일 마무리
+            if event.end_stream and stream_info.header_parsed:
                 self._save_file(stream_id)
 
     def _save_file(self, stream_id: int):
-        """파일을 디스크에 저장"""
+        """수신 파일을 마무리하고 통계를 출력"""
         stream_info = self.streams[stream_id]
-        filename = stream_info["filename"]
-        filesize = stream_info["filesize"]
-        file_data = stream_info["data"]
-        start_time = stream_info["start_time"]
-
-        # 디렉토리 생성
-        Path(self.target_dir).mkdir(parents=True, exist_ok=True)
-        filepath = os.path.join(self.target_dir, filename)
+        filename = stream_info.filename
+        filesize = stream_info.filesize
+        filepath = stream_info.filepath
+        start_time = stream_info.start_time
 
-        # 파일 쓰기
+        # 청크가 도착할 때마다 이미 디스크에 썼으므로 여기서는 닫기만 한다
         write_start = time.time()
-        with open(filepath, "wb") as f:
-            f.write(file_data)
+        stream_info.fp.close()
         write_end = time.time()
 
         # 통계 계산
         transfer_time = write_start - start_time
         write_time = write_end - write_start
         total_time = write_end - start_time
-        actual_size = len(file_data)
+        actual_size = stream_info.received
         transfer_speed = (
             actual_size / transfer_time / 1024 / 1024 if transfer_time > 0 else 0
         )
@@ -141,6 +194,7 @@ class QUIC(Protocol):
     """QUIC 프로토콜 구현"""
 
     MSS = 1200  # QUIC의 일반적인 최대 UDP 페이로드 크기
+    SEND_CHUNK_SIZE = 256 * 1024  # 파일 스트리밍 전송 시 한 번에 읽는 크기
 
     def __init__(self):
         if not QUIC_AVAILABLE:
@@ -200,25 +254,37 @@ class QUIC(Protocol):
                 connection_time = time.time() - start_time
                 logger.info(f"서버 연결 완료 (소요 시간: {connection_time:.2f}초)")
 
-                # 파일 읽기
-                filesize = os.path.getsize(filename)
-                with open(filename, "rb") as f:
-                    file_data = f.read()
+                _tune_udp_socket(client._transport)
 
-                # 헤더 생성 (8바이트 파일크기 + 256바이트 파일명)
-                import struct
+                filesize = os.path.getsize(filename)
 
-                header = struct.pack("!Q", filesize) + os.path.basename(
-                    filename
-                ).encode("utf-8").ljust(256, b"\x00")
+                # 헤더 생성 (포맷은 _FHDR 참조, pack_into로 한 버퍼에 기록)
+                header = bytearray(_FHDR.size)
+                _FHDR.pack_into(
+                    header,
+                    0,
+                    filesize,
+                    os.path.basename(filename).encode("utf-8")[:256],
+                )
 
                 # 스트림 생성 및 데이터 전송
                 stream_id = client._quic.get_next_available_stream_id()
                 transfer_start = time.time()
 
+                # 파일 전체를 메모리에 올려 헤더와 이어붙이는 대신
+                # 고정 크기 청크를 읽는 대로 스트림에 흘려보낸다
                 client._quic.send_stream_data(
-                    stream_id, header + file_data, end_stream=True
+                    stream_id, bytes(header), end_stream=False
                 )
+                with open(filename, "rb") as f:
+                    while chunk := f.read(self.SEND_CHUNK_SIZE):
+                        client._quic.send_stream_data(
+                            stream_id, chunk, end_stream=False
+                        )
+                        client.transmit()
+                        # 이벤트 루프가 수신 이벤트를 처리할 기회를 준다
+                        await asyncio.sleep(0)
+                client._quic.send_stream_data(stream_id, b"", end_stream=True)
                 client.transmit()
 
                 # 응답 대기
@@ -297,7 +363,7 @@ class QUIC(Protocol):
 
         # 서버 시작
         try:
-            await serve(
+            server = await serve(
                 host,
                 port,
                 configuration=configuration,
@@ -305,6 +371,7 @@ class QUIC(Protocol):
                     *args, target_dir=target_dir, **kwargs
                 ),
             )
+            _tune_udp_socket(getattr(server, "_transport", None))
 
             # 서버 무한 실행
             await asyncio.Future()  # 무한 대기
@@ -315,19 +382,35 @@ class QUIC(Protocol):
             logger.error(f"서버 오류: {e}")
 
     def _generate_self_signed_cert(self):
-        """자체 서명 인증서 생성 (개발용)"""
+        """자체 서명 인증서 생성 (개발용)
+
+        이미 만들어 둔 유효한 인증서가 있으면 재사용해서 서버 시작 경로에서
+        키 생성을 생략합니다. 새로 만들 때는 RSA-2048보다 키 생성이 훨씬
+        빠른 Ed25519를 사용합니다 (TLS 1.3에서 지원).
+        """
         from cryptography import x509
         from cryptography.x509.oid import NameOID
-        from cryptography.hazmat.primitives import hashes
-        from cryptography.hazmat.primitives.asymmetric import rsa
+        from cryptography.hazmat.primitives.asymmetric import ed25519
         from cryptography.hazmat.primitives import serialization
         import datetime
 
+        cert_dir = Path("certs")
+        cert_path = cert_dir / "cert.pem"
+        key_path = cert_dir / "key.pem"
+
+        # 유효기간이 남은 기존 인증서는 그대로 재사용
+        if cert_path.exists() and key_path.exists():
+            try:
+                cached = x509.load_pem_x509_certificate(cert_path.read_bytes())
+                if cached.not_valid_after > datetime.datetime.utcnow():
+                    logger.info(f"기존 인증서 재사용: {cert_path}")
+                    return str(cert_path), str(key_path)
+            except ValueError:
+                # 손상된 인증서면 새로 만든다
+                pass
+
         # 개인키 생성
-        private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=2048,
-        )
+        private_key = ed25519.Ed25519PrivateKey.generate()
 
         # 인증서 생성
         subject = issuer = x509.Name(
@@ -357,16 +440,13 @@ class QUIC(Protocol):
                 ),
                 critical=False,
             )
-            .sign(private_key, hashes.SHA256())
+            # Ed25519는 서명 해시를 키 자체가 결정하므로 None을 넘긴다
+            .sign(private_key, None)
         )
 
         # 파일로 저장
-        cert_dir = Path("certs")
         cert_dir.mkdir(exist_ok=True)
 
-        cert_path = cert_dir / "cert.pem"
-        key_path = cert_dir / "key.pem"
-
         with open(cert_path, "wb") as f:
             f.write(cert.public_bytes(serialization.Encoding.PEM))
 
@@ -1,5 +1,9 @@
+from __future__ import annotations
+
 import array
+import asyncio
 import math
+import mmap
 import os
 import socket
 import struct
@@ -7,96 +11,80 @@ import time
 from pathlib import Path
 
 from protocol import Protocol, BUFFER_SIZE
-from utils import flush_receive_buffer, make_new_filename
+from utils import flush_receive_buffer, make_new_filename, send_packets
 import logger
 
 KB = 1024
 MTU_DATA_SIZE = 1480
 REDUNDANCY_SIZE = 8
 
+# 패킷마다 포맷 문자열을 다시 해석하지 않도록 미리 컴파일해 둔다
+_HDR = struct.Struct("!II")  # (seq_number, chunk_size)
+_FILEINFO = struct.Struct("!II256s")  # (buffer_size, total_chunks, filename)
 
-def wait_ack(sock: socket.socket, timeout: float = 3.0) -> array.array[int]:
-    """
-    ack를 기다립니다. 일정 시간동안 응답이 없을 경우 예외를 발생시킵니다.
-    Args:
-        sock : ack를 받아들일 socket을 지정합니다.
-        timeout : ack가 해당 시간동안 없을 경우 예외를 발생시킵니다.
 
-    Returns:
-        ack를 받았을 경우 해당 ack에 존재하는 missed_seq_numbers를 반환합니다.
+class _RUDPClientProtocol(asyncio.DatagramProtocol):
+    """
+    RUDP 클라이언트의 ACK 수신을 이벤트 루프에 맡기는 프로토콜입니다.
 
-    Raises:
-        socket.timeout : 해당 소켓에서 일정 시간동안 응답이 없을 경우 발생합니다.
+    수신한 ACK(정수 배열)를 큐에 넣어 주므로, 송신 코루틴은 전송을
+    계속하면서 도착해 있는 ACK를 꺼내 처리할 수 있습니다.
     """
-    sock.settimeout(timeout)
 
-    try:
-        packed_data, addr = sock.recvfrom(KB * 32)
-        # ACK는 정수의 배열
-        result_array = array.array("i")
-        result_array.frombytes(packed_data)
-        logger.info(f"ACK전달받음 : {result_array}")
-    except socket.timeout:
-        raise socket.timeout
+    def __init__(self):
+        self.ack_queue = asyncio.Queue()
+
+    def datagram_received(self, data: bytes, addr: tuple):
+        ack = array.array("i")
+        ack.frombytes(data)
+        # ACK 배열 전체를 문자열로 만드는 비용이 크므로 DEBUG에서만 기록
+        if logger.is_enabled_for(logger.LogLevel.DEBUG):
+            logger.debug(f"ACK전달받음 : {ack}")
+        self.ack_queue.put_nowait(ack)
 
-    sock.setblocking(False)
-    return result_array
+
+# ACK 전송 때마다 array를 새로 만들지 않도록 버퍼를 재사용한다
+_ack_buffer = array.array("i")
 
 
 def send_ack(missed_seqs: list[int], sock: socket.socket, target_address: tuple):
-    arr = array.array("i", missed_seqs)
-    packed = arr.tobytes()
-    logger.info(f"전송할 패킷정보 크기 {len(packed)}")
-    logger.info(f"손실된 옹량 {len(packed) / 4 * MTU_DATA_SIZE}")
+    del _ack_buffer[:]
+    _ack_buffer.fromlist(missed_seqs)
+    packed = _ack_buffer.tobytes()
+    if logger.is_enabled_for(logger.LogLevel.DEBUG):
+        logger.debug(f"전송할 패킷정보 크기 {len(packed)}")
+        logger.debug(f"손실된 옹량 {len(packed) / 4 * MTU_DATA_SIZE}")
     try:
         sock.sendto(packed, target_address)
     except OSError as e:
         logger.info(f"너무 많은 loss")
 
 
+def build_packet(mm: mmap.mmap, seq_number: int, chunk_size: int) -> bytes:
+    """
+    mmap된 원본 파일에서 seq_number에 해당하는 패킷을 재구성합니다.
+
+    전송한 패킷을 따로 보관하지 않아도 페이지 캐시에 남아 있는 파일
+    내용으로 재전송 패킷을 즉시 만들 수 있습니다.
+    """
+    start = seq_number * chunk_size
+    chunk = mm[start : start + chunk_size]
+    return _HDR.pack(seq_number, len(chunk)) + chunk
+
+
 def resend_dropped_data(
     sock: socket.socket,
     dropped_seq_numbers: list[int] | array.array[int],
-    packet_dict: dict,
+    mm: mmap.mmap,
+    chunk_size: int,
     server_addr: tuple[str, int],
 ):
     """ """
-    for seq_number in dropped_seq_numbers:
-        sock.sendto(packet_dict[seq_number], server_addr)
-
-
-def process_ack(
-    sock: socket.socket,
-    client_address: tuple,
-    packet_dict: dict,
-    last_seq_number: int,
-    timeout: float = 0.5,
-) -> array.array:
-    """
-    ack를 받아 처리하고, ack가 오지 않을 경우 마지막 chucnk를 재전송합니다. ack를 받을 경우 ack를 반환합니다.
-
-    Args:
-        sock (socket) : ACK수신 및 마지막 청크 재전송을 위한 소켓입니다.
-        client_address (tuple) : 이를 위한 타켓 네트워크 주소 및 포트입니다.
-        packet_dict (dict) : ACK를 전달맏지 못할 경우 전송하는데 사용하는 패킷 dict입니다.
-        last_seq_number (int): 현재 전송에서 ACK를 유발하는 마지막 seq_number입니다.
-        timeout (float): ACK를 기다리는 시간입니다.
-    """
-    retry_count = 0
-    while True:
-        try:
-            logger.info(f"ACK를 기다리는 중")
-            logger.info(f"받아야 할 seq_number: {last_seq_number}")
-            return wait_ack(sock, timeout)
-        except socket.timeout:
-            retry_count += 1
-            if retry_count > 5:
-                logger.info(f"재전송 초과됨 횟수 초과됨")
-                raise socket.timeout
-            logger.info(
-                f"ACK 재전송 seq_number {last_seq_number} | 재전송 : {retry_count}"
-            )
-            sock.sendto(packet_dict[last_seq_number], client_address)
+    packets = [
+        build_packet(mm, seq_number, chunk_size)
+        for seq_number in dropped_seq_numbers
+    ]
+    send_packets(sock, packets, server_addr)
 
 
 class RUDP(Protocol):
@@ -114,8 +102,27 @@ class RUDP(Protocol):
         buffer_size: int = MTU_DATA_SIZE,
         interval: float = 0.0,
     ):
-        # 클라이언트 소켓 생성
+        return asyncio.run(
+            self._send_file_async(filename, host, port, buffer_size, interval)
+        )
+
+    async def _send_file_async(
+        self,
+        filename: str,
+        host: str,
+        port: int,
+        buffer_size: int,
+        interval: float,
+    ):
+        # ACK 수신은 이벤트 루프의 DatagramProtocol이 맡고, 송신은 같은
+        # 소켓으로 직접 수행한다. 전송 중에도 루프가 ACK를 큐에 쌓아 주므로
+        # 송신과 ACK 처리가 겹쳐서 진행된다
         client_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        client_socket.setblocking(False)
+        loop = asyncio.get_running_loop()
+        transport, protocol = await loop.create_datagram_endpoint(
+            _RUDPClientProtocol, sock=client_socket
+        )
         server_address = (host, port)
         logger.info(f"파일 {filename}을(를) 전송합니다...")
         logger.info(f"서버 주소: {host}:{port}")
@@ -139,65 +146,116 @@ class RUDP(Protocol):
             logger.info(f"청크 수: {total_chunks}")
 
             # 파일 정보 전송 (파일명 + 총 청크 수)
-            file_info = struct.pack(
-                "!II256s", buffer_size, total_chunks, filename.encode()[:256]
+            file_info = _FILEINFO.pack(
+                buffer_size, total_chunks, filename.encode()[:256]
             )
             client_socket.sendto(file_info[:512], server_address)
 
-            # 청크를 보관하기 위한 dictionary
-            packet_dict = {}
             # 파일 전송 시작
-
+            # 전송한 패킷을 dict에 보관하는 대신 원본 파일을 mmap해 두고
+            # 재전송이 필요할 때 페이지 캐시에서 패킷을 재구성한다
+            # (메모리 사용량이 O(파일 크기)에서 O(1)로 줄어든다)
             start_time = time.time()
-            with open(filename, "rb") as f:
+
+            # interval이 OS 타이머 해상도(~1ms)보다 짧으면 패킷마다 자는 대신
+            # 여러 패킷을 몰아 보내고 한 번만 잔다. 절대 기한(deadline)을
+            # 누적하므로 sleep 오차가 쌓이지 않는다. interval==0이면 건너뜀.
+            if interval > 0.0:
+                pacing_burst = min(64, max(1, round(0.001 / interval)))
+                batch_size = pacing_burst
+                next_deadline = time.perf_counter()
+            else:
+                batch_size = 32
+
+            # 묶음 크기만큼의 패킷 버퍼를 링으로 재사용하면서
+            # 한 묶음을 sendmmsg 한 번으로 전송한다
+            ring = [bytearray(buffer_size) for _ in range(batch_size)]
+            ring_views = [memoryview(buf) for buf in ring]
+            batch = []
+
+            with open(filename, "rb") as f, mmap.mmap(
+                f.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mm:
                 for seq_num in range(total_chunks):
-                    chunk_data = f.read(chunk_size)
+                    slot = len(batch)
+                    read_size = f.readinto(ring_views[slot][REDUNDANCY_SIZE:])
 
                     # SEQ 번호와 청크 크기를 포함하여 패킷 구성
-                    packet = struct.pack("!II", seq_num, chunk_size) + chunk_data
-                    packet_dict[seq_num] = packet
-                    client_socket.sendto(packet, server_address)
+                    _HDR.pack_into(ring[slot], 0, seq_num, read_size)
+                    batch.append(ring_views[slot][: REDUNDANCY_SIZE + read_size])
                     total_packets_sent += 1
 
-                    time.sleep(interval)
-
-                    # 진행률 출력
-                    progress = ((seq_num + 1) / total_chunks) * 100
-                    print(
-                        f"\r전송 진행률: {progress:.1f}% 전송한 패킷 {seq_num:d}",
-                        end="",
-                    )
-
-            initial_send_time = time.time() - start_time
-            logger.info(f"\n파일 {filename} 초기 전송 완료")
-            logger.info(f"초기 전송 소요시간 {initial_send_time:.2f}초")
+                    if len(batch) == batch_size or seq_num == total_chunks - 1:
+                        send_packets(client_socket, batch, server_address)
+                        batch.clear()
 
-            transfer_complete = False
+                        if interval > 0.0:
+                            next_deadline += interval * pacing_burst
+                            delay = next_deadline - time.perf_counter()
+                            if delay > 0:
+                                await asyncio.sleep(delay)
+                        else:
+                            # 이벤트 루프가 ACK 수신을 처리할 기회를 준다
+                            await asyncio.sleep(0)
+
+                    # 진행률 출력 (패킷마다 찍으면 포맷/쓰기 비용이 전송을
+                    # 압도하므로 1024개마다 + 마지막에만 갱신)
+                    if (seq_num & 1023) == 0 or seq_num == total_chunks - 1:
+                        progress = ((seq_num + 1) / total_chunks) * 100
+                        print(
+                            f"\r전송 진행률: {progress:.1f}% 전송한 패킷 {seq_num:d}",
+                            end="",
+                        )
+
+                initial_send_time = time.time() - start_time
+                logger.info(f"\n파일 {filename} 초기 전송 완료")
+                logger.info(f"초기 전송 소요시간 {initial_send_time:.2f}초")
+
+                transfer_complete = False
+
+                last_seq_number = total_chunks - 1
+                retry_count = 0
+                while not transfer_complete:
+                    try:
+                        dropped_seq_numbers = await asyncio.wait_for(
+                            protocol.ack_queue.get(), timeout=0.5
+                        )
+                        retry_count = 0
+                    except asyncio.TimeoutError:
+                        retry_count += 1
+                        if retry_count > 5:
+                            logger.info(f"재전송 초과됨 횟수 초과됨")
+                            losses.append([-1])
+                            break
+                        logger.info(
+                            f"ACK 재전송 seq_number {last_seq_number} | 재전송 : {retry_count}"
+                        )
+                        client_socket.sendto(
+                            build_packet(mm, last_seq_number, chunk_size),
+                            server_address,
+                        )
+                        continue
 
-            last_seq_number = len(packet_dict) - 1
-            while not transfer_complete:
-                try:
-                    dropped_seq_numbers = process_ack(
-                        client_socket, server_address, packet_dict, last_seq_number
-                    )
                     losses.append(dropped_seq_numbers)
-                except socket.timeout:
-                    losses.append([-1])
-                    break
-                if len(dropped_seq_numbers) == 0:
-                    logger.info(f"완료된 ACK 전달받음")
-                    transfer_complete = True
-                else:
-                    last_seq_number = max(dropped_seq_numbers)
-                    packet_loss_count = len(dropped_seq_numbers)
-                    total_packets_lost += packet_loss_count
-                    total_packets_sent += packet_loss_count  # 재전송도 카운트
-                    logger.info(
-                        f"소실패킷 재전송 dropped_seq_numbers: {dropped_seq_numbers}"
-                    )
-                    resend_dropped_data(
-                        client_socket, dropped_seq_numbers, packet_dict, server_address
-                    )
+                    if len(dropped_seq_numbers) == 0:
+                        logger.info(f"완료된 ACK 전달받음")
+                        transfer_complete = True
+                    else:
+                        last_seq_number = max(dropped_seq_numbers)
+                        packet_loss_count = len(dropped_seq_numbers)
+                        total_packets_lost += packet_loss_count
+                        total_packets_sent += packet_loss_count  # 재전송도 카운트
+                        if logger.is_enabled_for(logger.LogLevel.DEBUG):
+                            logger.debug(
+                                f"소실패킷 재전송 dropped_seq_numbers: {dropped_seq_numbers}"
+                            )
+                        resend_dropped_data(
+                            client_socket,
+                            dropped_seq_numbers,
+                            mm,
+                            chunk_size,
+                            server_address,
+                        )
 
             # 전송 완료 후 통계 출력
             end_time = time.time()
@@ -222,7 +280,7 @@ class RUDP(Protocol):
             logger.info(f"{'='*50}")
 
         finally:
-            client_socket.close()
+            transport.close()
             return losses
 
     def start_server(
@@ -252,10 +310,10 @@ class RUDP(Protocol):
                 data, client_address = server_socket.recvfrom(
                     512
                 )  # 초기 정보는 작은 크기로 받음
-            except:
+            except (socket.timeout, BlockingIOError):
                 # flush_receive_buffer(server_socket)
                 continue
-            buffer_size, total_chunks, filename = struct.unpack("!II256s", data[:264])
+            buffer_size, total_chunks, filename = _FILEINFO.unpack_from(data)
             try:
                 filename = filename.decode().strip("\x00")
             except UnicodeDecodeError:
@@ -265,8 +323,26 @@ class RUDP(Protocol):
                 f"파일 {filename}을(를) 받기 시작합니다... (총 {total_chunks}개 청크) (버퍼사이즈 {buffer_size})"
             )
 
-            # 이후 데이터 수신할 때는 지정된 버퍼 크기 사용
-            chunks = {}
+            # 수신 파일을 미리 만들어 두고 패킷이 도착하는 즉시 제자리에 쓴다.
+            # 청크를 메모리에 모았다가 마지막에 재조합하는 방식과 달리
+            # 메모리 사용량이 O(파일 크기)에서 비트맵 크기로 줄고
+            # 별도의 재조합 단계가 사라진다
+            data_size = buffer_size - REDUNDANCY_SIZE
+            file_path = f"{target_dir}/{filename}"
+            Path(target_dir).mkdir(parents=True, exist_ok=True)
+            make_new_filename(file_path)
+            fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+            try:
+                os.posix_fallocate(fd, 0, total_chunks * data_size)
+            except OSError:
+                # 파일시스템이 지원하지 않으면 그냥 쓰면서 늘린다
+                pass
+
+            # 수신 여부 비트맵 (청크당 1바이트). 손실 seq 계산 시
+            # 전체 seq 집합을 매번 만들지 않고 이 비트맵만 훑는다
+            received = bytearray(total_chunks)
+            unique_packets = 0
+            final_size = total_chunks * data_size
             start_time = time.time()
             timeout = 5
 
@@ -274,43 +350,67 @@ class RUDP(Protocol):
             total_packets_received = 0
             total_packets_expected = total_chunks
 
+            # 직전에 보낸 ACK 내용/시각 (같은 ACK의 중복 전송 방지용)
+            prev_missed_hash = None
+            last_ack_time = 0.0
+
             is_error = False
 
-            while len(chunks) < total_chunks:
+            # 타임아웃은 수신 루프 전에 한 번만 설정한다
+            # (settimeout은 패킷마다 부를 경우 매번 시스템콜을 유발)
+            server_socket.settimeout(timeout)
+
+            while unique_packets < total_chunks:
                 try:
                     # 실제 데이터 수신 시에는 buffer_size 사용
                     last_signal_time = time.time()
 
-                    server_socket.settimeout(timeout)
                     data, _ = server_socket.recvfrom(buffer_size)
 
-                    seq_num, chunk_size = struct.unpack("!II", data[:REDUNDANCY_SIZE])
+                    seq_num, chunk_size = _HDR.unpack_from(data)
                     chunk_data = data[REDUNDANCY_SIZE : REDUNDANCY_SIZE + chunk_size]
 
-                    chunks[seq_num] = chunk_data
+                    os.pwrite(fd, chunk_data, seq_num * data_size)
+                    if not received[seq_num]:
+                        received[seq_num] = 1
+                        unique_packets += 1
                     total_packets_received += 1
 
-                    # 진행률 출력
-                    progress = (len(chunks) / total_chunks) * 100
-                    print(
-                        f"\r수신 진행률: {progress:.1f}% seq_num: {seq_num} / {last_seq_num}",
-                        end="",
-                    )
+                    # 마지막 청크가 잘려 있으면 실제 파일 크기를 보정
+                    if seq_num == total_chunks - 1:
+                        final_size = seq_num * data_size + len(chunk_data)
+
+                    # 진행률 출력 (1024개마다 + 마지막 청크에서만 갱신)
+                    if (total_packets_received & 1023) == 0 or seq_num == last_seq_num:
+                        progress = (unique_packets / total_chunks) * 100
+                        print(
+                            f"\r수신 진행률: {progress:.1f}% seq_num: {seq_num} / {last_seq_num}",
+                            end="",
+                        )
 
                     # 마지막 청크인지 체크
                     if seq_num == last_seq_num:
 
-                        received_seqs = set(chunks.keys())
-                        all_seqs = set(range(total_chunks))
-                        missed_seqs = list(all_seqs - received_seqs)
+                        missed_seqs = [i for i, r in enumerate(received) if not r]
                         logger.info(f"마지막 청크 도달 seq_num = {seq_num}")
 
-                        logger.info(f"분실된 패킷 : {missed_seqs}")
+                        if logger.is_enabled_for(logger.LogLevel.DEBUG):
+                            logger.debug(f"분실된 패킷 : {missed_seqs}")
                         if len(missed_seqs) > 0:
                             last_seq_num = max(missed_seqs)
                             logger.info(f"새로운 last_seq = {last_seq_num}")
 
-                        send_ack(missed_seqs, server_socket, client_address)
+                        # 재전송된 마지막 청크가 연달아 도착해도 내용이 같은
+                        # ACK를 짧은 간격으로 반복 전송하지 않는다
+                        ack_hash = hash(tuple(missed_seqs))
+                        now = time.monotonic()
+                        if (
+                            ack_hash != prev_missed_hash
+                            or now - last_ack_time >= 0.05
+                        ):
+                            send_ack(missed_seqs, server_socket, client_address)
+                            prev_missed_hash = ack_hash
+                            last_ack_time = now
 
                 except (struct.error, IndexError) as e:
                     logger.info(f"\n패킷 손상: {e}")
@@ -325,22 +425,12 @@ class RUDP(Protocol):
                 transfer_end_time = time.time()
                 transfer_elapsed_time = transfer_end_time - start_time
 
-                logger.info("\n모든 청크 수신 완료. 파일 재조합 시작...")
-
-                file_path = f"{target_dir}/{filename}"
-
-                Path(target_dir).mkdir(parents=True, exist_ok=True)
+                logger.info("\n모든 청크 수신 완료. 파일 마무리 중...")
 
-                make_new_filename(file_path)
-
-                # 파일 재조합
+                # 수신 중에 이미 제자리에 기록했으므로 길이 보정 후 닫기만 한다
                 write_start = time.time()
-                with open(file_path, "wb") as f:
-                    for i in range(total_chunks):
-                        if i in chunks:
-                            f.write(chunks[i])
-                        else:
-                            logger.info(f"경고: 청크 {i} 유실")
+                os.ftruncate(fd, final_size)
+                os.close(fd)
 
                 write_end = time.time()
                 write_time = write_end - write_start
@@ -349,7 +439,6 @@ class RUDP(Protocol):
                 transfer_speed = file_size / transfer_elapsed_time / 1024 / 1024
 
                 # 패킷 손실률 계산 (총 수신 패킷 대비 unique 패킷)
-                unique_packets = len(chunks)
                 duplicate_packets = total_packets_received - unique_packets
                 packet_loss_count = total_packets_expected - unique_packets
 
@@ -369,3 +458,7 @@ class RUDP(Protocol):
                 logger.info(f"저장 경로: {file_path}")
                 logger.info(f"{'='*50}")
                 logger.debug(f"{transfer_speed}")
+            else:
+                # 수신 실패: 미완성 파일은 남기지 않는다
+                os.close(fd)
+                os.remove(file_path)
@@ -2,17 +2,77 @@ import socket
 import time
 import os
 import struct
-import json
 import logger
 import io
+import math
 
 from protocol import Protocol, BUFFER_SIZE
+from utils import json_dumps, json_loads
+
+# 기본 커널 버퍼로는 BDP(대역폭×지연)가 큰 경로에서 윈도우가 부족해
+# 전송이 ACK 대기로 멈추므로 송수신 버퍼를 넉넉하게 잡는다.
+# (상한은 net.core.rmem_max / wmem_max 가 결정한다)
+_SOCKET_BUFFER_SIZE = 16 * 1024 * 1024
+
+# 헤더 길이 필드 포맷 (4바이트 빅엔디언 정수)
+_U32 = struct.Struct("!I")
+
+# 이보다 작은 파일은 sendfile 설정 비용이 더 크므로 일반 전송을 쓴다
+_SENDFILE_MIN_SIZE = 64 * 1024
+
+
+def _recv_exact(conn: socket.socket, n: int, view: memoryview) -> memoryview:
+    """
+    스트림에서 정확히 n바이트를 받을 때까지 반복 수신합니다.
+
+    TCP는 스트림이므로 recv 한 번이 요청한 길이를 다 돌려준다는 보장이
+    없다. 짧게 끊겨 온 헤더를 그대로 파싱하지 않도록 채워질 때까지 읽는다.
+    """
+    got = 0
+    while got < n:
+        r = conn.recv_into(view[got:n])
+        if r == 0:
+            raise EOFError("수신 중 연결이 종료되었습니다.")
+        got += r
+    return view[:n]
+
+
+def _tune_tcp_socket(sock: socket.socket, sndbuf: int = 0, rcvbuf: int = 0):
+    """SO_SNDBUF / SO_RCVBUF를 키우고 Nagle 알고리즘을 끕니다."""
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, sndbuf or _SOCKET_BUFFER_SIZE)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf or _SOCKET_BUFFER_SIZE)
+    # 작은 헤더 전송이 Nagle에 묶여 지연되지 않도록 한다
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
 
 class TCP(Protocol):
 
     MSS = 1460
 
+    @staticmethod
+    def _send_chunked(sock, file, filesize, buffer_size, interval):
+        """버퍼 크기 단위로 읽어 전송합니다 (sendfile을 못 쓰는 경우의 경로)."""
+        bytes_sent = 0
+        segments_sent = 0
+        while True:
+            data = file.read(buffer_size)
+            if not data:
+                break
+            sock.sendall(data)
+            bytes_sent += len(data)
+            segments_sent += 1
+            # f-string 포맷 비용이 전송 루프를 압도하지 않도록
+            # DEBUG가 켜진 경우에만, 1024청크마다 한 번 기록한다
+            if (segments_sent & 1023) == 0 and logger.is_enabled_for(
+                logger.LogLevel.DEBUG
+            ):
+                logger.debug(
+                    f"전송 중: {bytes_sent}/{filesize} 바이트 ({bytes_sent / filesize * 100:.2f}%)"
+                )
+            if interval > 0.0:
+                time.sleep(interval)
+        return bytes_sent
+
     def send_file(
         self,
         filename: str,
@@ -39,6 +99,7 @@ class TCP(Protocol):
         try:
             # 소켓 생성 및 연결
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            _tune_tcp_socket(sock, self.so_sndbuf, self.so_rcvbuf)
             connection_start = time.time()
             sock.connect((host, port))
             connection_time = time.time() - connection_start
@@ -48,33 +109,75 @@ class TCP(Protocol):
             file_info = {"filename": os.path.basename(filename), "filesize": filesize}
 
             # 헤더 정보를 JSON으로 변환 후 전송
-            file_info_json = json.dumps(file_info).encode("utf-8")
-            header = struct.pack("!I", len(file_info_json))
-            sock.sendall(header)
-            sock.sendall(file_info_json)
+            # TCP_CORK로 작은 헤더/JSON 조각을 본문 첫 세그먼트와 묶어
+            # MSS를 채운 세그먼트로 내보낸다 (리눅스 전용이라 hasattr로 확인)
+            has_cork = hasattr(socket, "TCP_CORK")
+            if has_cork:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 1)
+
+            file_info_json = json_dumps(file_info)
+            header = _U32.pack(len(file_info_json))
+            # 길이 필드와 JSON을 iovec 2개짜리 sendmsg 한 번으로 보내
+            # 시스템콜 하나를 줄이고 같은 세그먼트에 실리게 한다
+            sent = sock.sendmsg([header, file_info_json])
+            if sent < len(header) + len(file_info_json):
+                # 짧은 전송은 드물지만, 남은 부분을 마저 보낸다
+                sock.sendall((header + file_info_json)[sent:])
+
+            if has_cork:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 0)
 
             # 파일 데이터 전송
             transfer_start = time.time()
             bytes_sent = 0
-            segments_sent = 0
             with open(filename, "rb") as file:
-                while True:
-                    data = file.read(buffer_size)
-                    if not data:
-                        break
-                    sock.sendall(data)
-                    bytes_sent += len(data)
-                    segments_sent += 1
-                    logger.debug(
-                        f"전송 중: {bytes_sent}/{filesize} 바이트 ({bytes_sent / filesize * 100:.2f}%)"
+                if interval > 0.0 or filesize < _SENDFILE_MIN_SIZE:
+                    # 전송 간격이 필요하거나 파일이 작으면 청크 단위로 전송
+                    bytes_sent = self._send_chunked(
+                        sock, file, filesize, buffer_size, interval
                     )
-                    time.sleep(interval)
+                else:
+                    # 커널 쪽 복사 경로라는 힌트 (지원 안 하면 무시)
+                    try:
+                        sock.setsockopt(
+                            socket.SOL_SOCKET, socket.SO_ZEROCOPY, 1
+                        )
+                    except (AttributeError, OSError):
+                        pass
+                    try:
+                        # sendfile(2)로 커널이 페이지 캐시에서 소켓으로 바로
+                        # 복사한다 (유저 공간 복사와 파이썬 루프 제거).
+                        # os.sendfile을 직접 반복 호출해 래퍼 비용도 없앤다
+                        offset = 0
+                        while offset < filesize:
+                            sent = os.sendfile(
+                                sock.fileno(),
+                                file.fileno(),
+                                offset,
+                                filesize - offset,
+                            )
+                            if sent == 0:
+                                break
+                            offset += sent
+                        bytes_sent = offset
+                    except OSError:
+                        logger.warning(
+                            "sendfile을 사용할 수 없어 일반 전송으로 대체합니다."
+                        )
+                        file.seek(0)
+                        bytes_sent = self._send_chunked(
+                            sock, file, filesize, buffer_size, interval
+                        )
+            segments_sent = math.ceil(bytes_sent / buffer_size)
 
             transfer_end = time.time()
             transfer_time = transfer_end - transfer_start
             transfer_speed = filesize / transfer_time / 1024 / 1024  # MB/s
 
             # 서버로부터 수신 확인 메시지 받기
+            # 마지막 세그먼트의 ACK이 지연 ACK에 묶이지 않도록 한다
+            if hasattr(socket, "TCP_QUICKACK"):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
             response = sock.recv(1024).decode("utf-8")
             logger.info(f"서버 응답: {response}")
 
@@ -126,6 +229,10 @@ class TCP(Protocol):
         # 소켓 생성 및 바인딩
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # bind 전에 설정해야 accept된 연결이 수신 버퍼 크기를 물려받는다
+        sock.setsockopt(
+            socket.SOL_SOCKET, socket.SO_RCVBUF, self.so_rcvbuf or _SOCKET_BUFFER_SIZE
+        )
         sock.bind((host, port))
         sock.listen(5)
 
@@ -136,25 +243,31 @@ class TCP(Protocol):
         try:
             while True:
                 conn, addr = sock.accept()
+                _tune_tcp_socket(conn, self.so_sndbuf, self.so_rcvbuf)
                 # logger.info(f"클라이언트가 연결되었습니다: {addr}")
 
+                file = None
+                filepath = None
                 try:
                     # 전송 측정 시작 (파일 메타데이터 수신 직전)
                     time_start = time.time()
 
-                    # 헤더 사이즈 수신 (4바이트 정수)
-                    header = conn.recv(4)
-                    if not header or len(header) != 4:
-                        logger.error("유효하지 않은 헤더를 수신했습니다.")
+                    # 헤더와 파일 정보는 길이가 다 찰 때까지 반복 수신한다
+                    meta_buf = bytearray(65536)
+                    meta_view = memoryview(meta_buf)
+                    try:
+                        _recv_exact(conn, 4, meta_view)
+                        header_size = _U32.unpack_from(meta_buf)[0]
+
+                        # 파일 정보 수신
+                        file_info_json = bytes(
+                            _recv_exact(conn, header_size, meta_view)
+                        )
+                    except (EOFError, struct.error) as e:
+                        logger.error(f"유효하지 않은 헤더를 수신했습니다: {e}")
                         conn.close()
                         continue
-
-                    # 헤더 사이즈 추출
-                    header_size = struct.unpack("!I", header)[0]
-
-                    # 파일 정보 수신
-                    file_info_json = conn.recv(header_size).decode("utf-8")
-                    file_info = json.loads(file_info_json)
+                    file_info = json_loads(file_info_json)
 
                     filename = file_info["filename"]
                     filesize = file_info["filesize"]
@@ -163,21 +276,33 @@ class TCP(Protocol):
                     filepath = os.path.join(target_dir, filename)
 
                     # logger.info(f"파일 수신 시작: {filename} (크기: {filesize} 바이트)")
+                    # 전체 파일을 bytearray에 모았다가 쓰는 대신 수신한 청크를
+                    # 바로 디스크에 기록한다 (피크 메모리 절반, 디스크 쓰기가
+                    # 네트워크 수신과 겹쳐서 진행됨)
                     received_size = 0
-                    file_data = bytearray()
+                    file = open(filepath, "wb")
+                    try:
+                        # 블록을 미리 연속으로 확보해 조각화를 줄인다
+                        os.posix_fallocate(file.fileno(), 0, filesize)
+                    except OSError:
+                        pass
+
+                    # 반복마다 새 bytes를 만드는 recv 대신 미리 할당한
+                    # 버퍼 하나에 recv_into로 받아서 재사용한다
+                    recv_buf = bytearray(BUFFER_SIZE)
+                    recv_view = memoryview(recv_buf)
 
                     while received_size < filesize:
                         # 남은 데이터 크기 계산
                         to_read = min(BUFFER_SIZE, filesize - received_size)
 
                         # 데이터 수신
-                        data = conn.recv(to_read)
-                        if not data:
+                        n = conn.recv_into(recv_view[:to_read])
+                        if n == 0:
                             break
 
-                        # 메모리에 데이터 추가
-                        file_data.extend(data)
-                        received_size += len(data)
+                        file.write(recv_view[:n])
+                        received_size += n
 
                         # 진행 상황 로깅
                         # if received_size % (BUFFER_SIZE * 10) == 0 or received_size == filesize:
@@ -191,12 +316,9 @@ class TCP(Protocol):
 
                     # 수신 상태 확인
                     if received_size == filesize:
-                        # 파일 쓰기 시작
+                        # 남은 버퍼를 디스크로 내리고 파일을 닫는다
                         write_start = time.time()
-
-                        with open(filepath, "wb") as file:
-                            file.write(file_data)
-
+                        file.close()
                         write_end = time.time()
                         write_time = write_end - write_start
                         total_time = write_end - time_start
@@ -222,6 +344,9 @@ class TCP(Protocol):
                         )
                         conn.send(response_message.encode("utf-8"))
                     else:
+                        # 불완전 수신 - 쓰다 만 파일은 남기지 않는다
+                        file.close()
+                        os.remove(filepath)
                         logger.warning(
                             f"파일 '{filename}'의 수신이 불완전합니다. (예상: {filesize}, 실제: {received_size})"
                         )
@@ -232,7 +357,17 @@ class TCP(Protocol):
 
                 except Exception as e:
                     logger.error(f"파일 수신 중 오류 발생: {e}")
-                    conn.send(f"오류: {str(e)}".encode("utf-8"))
+                    # 에러 경로에서도 쓰다 만 파일은 남기지 않는다
+                    if file is not None and not file.closed:
+                        file.close()
+                        try:
+                            os.remove(filepath)
+                        except OSError:
+                            pass
+                    try:
+                        conn.send(f"오류: {str(e)}".encode("utf-8"))
+                    except OSError:
+                        pass
 
                 finally:
                     conn.close()
@@ -1,14 +1,20 @@
 import socket
+import sys
+import threading
+import queue
 import time
 import os
+import mmap
 import struct
-import json
 import logger
 import math
 from pathlib import Path
 
 from protocol import Protocol, BUFFER_SIZE
-from utils import make_new_filename
+from utils import json_dumps, json_loads, make_new_filename, send_packets
+
+# 패킷 헤더 포맷: seq_num(4) + total_chunks(4) + data_size(4)
+_PKT_HDR = struct.Struct("!III")
 
 
 class UDP(Protocol):
@@ -44,6 +50,8 @@ class UDP(Protocol):
         try:
             # UDP 소켓 생성
             sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            if self.so_sndbuf > 0:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.so_sndbuf)
             server_address = (host, port)
 
             # 파일 존재 확인
@@ -70,7 +78,7 @@ class UDP(Protocol):
                 "total_chunks": total_chunks,
                 "chunk_size": chunk_size,
             }
-            file_info_json = json.dumps(file_info).encode("utf-8")
+            file_info_json = json_dumps(file_info)
 
             # 헤더 패킷 전송 (마커로 식별 가능하도록)
             header_packet = b"FILE_INFO:" + file_info_json
@@ -81,26 +89,43 @@ class UDP(Protocol):
             start_time = time.time()
             total_packets_sent = 0
 
+            # 패킷마다 헤더 bytes와 이어붙인 bytes를 새로 만드는 대신
+            # 버퍼를 재사용한다: 파일을 버퍼 뒤쪽에 readinto로 바로
+            # 읽고 헤더는 pack_into로 앞 12바이트에 덮어쓴다.
+            # interval이 없으면 묶음 크기만큼의 버퍼 링을 돌려 쓰면서
+            # sendmmsg(utils.send_packets) 한 번으로 전송해 패킷당
+            # 시스템콜 비용을 줄인다 (간격 전송 시에는 묶지 않는다)
+            batch_size = (self.batch_size or 64) if interval <= 0 else 1
+            ring = [bytearray(buffer_size) for _ in range(batch_size)]
+            ring_views = [memoryview(b) for b in ring]
+            batch = []
+            # 진행률용 역수 (나눗셈 캐시, 0바이트 파일이면 청크가 없다)
+            inv_total = 100.0 / total_chunks if total_chunks else 0.0
+
             with open(filename, "rb") as f:
                 for seq_num in range(total_chunks):
-                    chunk_data = f.read(chunk_size)
-
                     # 패킷 구성: seq_num(4) + total_chunks(4) + data_size(4) + data
-                    packet = (
-                        struct.pack("!III", seq_num, total_chunks, len(chunk_data))
-                        + chunk_data
-                    )
-                    sock.sendto(packet, server_address)
+                    slot = len(batch)
+                    n = f.readinto(ring_views[slot][12:])
+                    _PKT_HDR.pack_into(ring[slot], 0, seq_num, total_chunks, n)
+                    batch.append(ring_views[slot][: 12 + n])
                     total_packets_sent += 1
 
-                    time.sleep(interval)
+                    if len(batch) == batch_size or seq_num == total_chunks - 1:
+                        send_packets(sock, batch, server_address)
+                        batch.clear()
 
-                    # 진행률 출력
-                    progress = ((seq_num + 1) / total_chunks) * 100
-                    print(
-                        f"\r전송 진행률: {progress:.1f}% ({seq_num + 1}/{total_chunks} 패킷)",
-                        end="",
-                    )
+                    # interval이 0이면 sleep 시스템콜 자체를 생략한다
+                    if interval > 0.0:
+                        time.sleep(interval)
+
+                    # 진행률 출력 (패킷마다 stdout에 쓰면 전송 속도를
+                    # 깎아먹으므로 4096패킷마다 + 마지막에만 갱신)
+                    if (seq_num & 0xFFF) == 0 or seq_num == total_chunks - 1:
+                        sys.stdout.write(
+                            f"\r전송 진행률: {(seq_num + 1) * inv_total:.1f}% ({seq_num + 1}/{total_chunks} 패킷)"
+                        )
+                        sys.stdout.flush()
 
             print()  # 줄바꿈
 
@@ -112,7 +137,7 @@ class UDP(Protocol):
             sock.settimeout(5.0)
             try:
                 response_data, _ = sock.recvfrom(4096)
-                response = json.loads(response_data.decode("utf-8"))
+                response = json_loads(response_data)
 
                 transfer_time = time.time() - start_time
                 transfer_speed = file_size / transfer_time / 1024 / 1024
@@ -158,7 +183,7 @@ class UDP(Protocol):
             except socket.timeout:
                 logger.error("서버 응답 타임아웃")
                 return False
-            except json.JSONDecodeError:
+            except ValueError:
                 logger.error("서버 응답 파싱 실패")
                 return False
 
@@ -196,181 +221,276 @@ class UDP(Protocol):
         Path(target_dir).mkdir(parents=True, exist_ok=True)
 
         # UDP 소켓 생성
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.bind((host, port))
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, BUFFER_SIZE)
+        # SO_REUSEPORT가 지원되면 같은 포트에 소켓을 여러 개 바인드하고
+        # 수신 스레드를 띄워 커널이 (주소, 포트) 해시로 흐름을 분산하게
+        # 한다. 한 송신자의 패킷은 한 소켓으로 모이므로 전송 상태는
+        # 스레드마다 독립적이고, 동시 송신자 수만큼 병렬성이 생긴다
+        worker_count = (
+            min(os.cpu_count() or 1, 4) if hasattr(socket, "SO_REUSEPORT") else 1
+        )
+        socks = []
+        for _ in range(worker_count):
+            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            if worker_count > 1:
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            s.bind((host, port))
+            s.setsockopt(
+                socket.SOL_SOCKET, socket.SO_RCVBUF, self.so_rcvbuf or BUFFER_SIZE
+            )
+            socks.append(s)
 
         logger.info(
-            f"서버가 {host}:{port}에서 실행 중입니다. 클라이언트 연결 대기 중..."
+            f"서버가 {host}:{port}에서 실행 중입니다. "
+            f"수신 스레드 {worker_count}개, 클라이언트 연결 대기 중..."
         )
 
+        for s in socks[1:]:
+            threading.Thread(
+                target=self._serve_socket, args=(s, target_dir), daemon=True
+            ).start()
+
         try:
-            while True:
-                # 파일 정보 수신 대기
-                try:
-                    data, client_address = sock.recvfrom(4096)
+            self._serve_socket(socks[0], target_dir)
+        except KeyboardInterrupt:
+            logger.info("\n서버를 종료합니다.")
+        finally:
+            for s in socks:
+                s.close()
+
+    def _serve_socket(self, sock: socket.socket, target_dir: str):
+        """소켓 하나에서 파일 수신 루프를 실행합니다 (수신 스레드 본체)."""
+        while True:
+            # 파일 정보 수신 대기
+            try:
+                data, client_address = sock.recvfrom(4096)
 
-                    # 헤더 패킷 확인
-                    if not data.startswith(b"FILE_INFO:"):
-                        continue
+                # 헤더 패킷 확인
+                if not data.startswith(b"FILE_INFO:"):
+                    continue
 
-                    # 파일 정보 파싱
-                    file_info_json = data[10:]  # 'FILE_INFO:' 제거
-                    file_info = json.loads(file_info_json.decode("utf-8"))
+                # 파일 정보 파싱
+                file_info_json = data[10:]  # 'FILE_INFO:' 제거
+                file_info = json_loads(file_info_json)
 
-                    filename = file_info["filename"]
-                    filesize = file_info["filesize"]
-                    total_chunks = file_info["total_chunks"]
-                    chunk_size = file_info["chunk_size"]
+                filename = file_info["filename"]
+                filesize = file_info["filesize"]
+                total_chunks = file_info["total_chunks"]
+                chunk_size = file_info["chunk_size"]
 
-                    logger.info(f"\n클라이언트 연결: {client_address}")
-                    logger.info(f"파일 수신 시작: {filename}")
-                    logger.info(
-                        f"예상 크기: {filesize:,} bytes ({filesize/1024/1024:.2f} MB)"
+                logger.info(f"\n클라이언트 연결: {client_address}")
+                logger.info(f"파일 수신 시작: {filename}")
+                logger.info(
+                    f"예상 크기: {filesize:,} bytes ({filesize/1024/1024:.2f} MB)"
+                )
+                logger.info(f"예상 청크: {total_chunks}")
+
+                # 데이터 수신
+                # 청크를 메모리에 모아 두었다가 나중에 쓰는 대신
+                # 크기만큼 미리 확보한 파일을 mmap해 두고 도착하는
+                # 즉시 제자리에 기록한다 (디스크 쓰기가 수신과 겹침)
+                filepath = make_new_filename(os.path.join(target_dir, filename))
+                out_file = open(filepath, "wb+")
+                out_file.truncate(filesize)
+                try:
+                    # 순차 대량 쓰기에 맞게 페이지 캐시/쓰기 지연을 설정
+                    os.posix_fadvise(
+                        out_file.fileno(),
+                        0,
+                        filesize,
+                        os.POSIX_FADV_SEQUENTIAL,
                     )
-                    logger.info(f"예상 청크: {total_chunks}")
+                except (AttributeError, OSError):
+                    pass
+                # 0바이트 파일은 mmap할 수 없고 기록할 청크도 없다
+                mm = mmap.mmap(out_file.fileno(), filesize) if filesize else None
 
-                    # 데이터 수신
-                    chunks = {}
-                    start_time = time.time()
-                    timeout = 10.0  # 10초 타임아웃
-                    sock.settimeout(timeout)
+                # 수신 여부는 청크당 1비트짜리 비트맵으로 관리한다
+                seen = bytearray((total_chunks + 7) // 8)
+                received_packets = 0
 
-                    last_packet_time = time.time()
+                # mmap 기록은 별도 쓰기 스레드에 맡겨 페이지 폴트로
+                # 수신 루프가 멈추지 않게 한다. 큐 크기를 제한해
+                # 디스크가 느릴 때 메모리 사용량에 상한을 둔다
+                write_queue = queue.Queue(maxsize=1024)
 
+                def _writer():
                     while True:
-                        try:
-                            data, addr = sock.recvfrom(65536)
-
-                            # 전송 완료 마커 확인
-                            if data == b"TRANSFER_END":
-                                logger.info(f"\n전송 완료 마커 수신")
-                                break
-
-                            # 패킷 파싱
-                            if len(data) < 12:
-                                continue
-
-                            seq_num, total, data_size = struct.unpack("!III", data[:12])
-                            chunk_data = data[12 : 12 + data_size]
-
-                            chunks[seq_num] = chunk_data
-                            last_packet_time = time.time()
-
-                            # 진행률 출력
-                            progress = (len(chunks) / total_chunks) * 100
-                            print(
-                                f"\r수신 진행률: {progress:.1f}% ({len(chunks)}/{total_chunks} 패킷)",
-                                end="",
+                        item = write_queue.get()
+                        if item is None:
+                            break
+                        seq, data = item
+                        offset = seq * chunk_size
+                        mm[offset : offset + len(data)] = data
+
+                writer = threading.Thread(target=_writer, daemon=True)
+                writer.start()
+
+                start_time = time.time()
+                timeout = 10.0  # 10초 타임아웃
+                sock.settimeout(timeout)
+
+                last_packet_time = time.time()
+
+                # 패킷마다 64KB bytes를 새로 만드는 recvfrom 대신
+                # 미리 할당한 버퍼 하나에 recvfrom_into로 받는다
+                recv_buf = bytearray(65536)
+                recv_view = memoryview(recv_buf)
+                inv_total = 100.0 / total_chunks if total_chunks else 0.0
+
+                while True:
+                    try:
+                        nbytes, addr = sock.recvfrom_into(recv_buf)
+
+                        # 전송 완료 마커 확인
+                        if recv_view[:nbytes] == b"TRANSFER_END":
+                            logger.info(f"\n전송 완료 마커 수신")
+                            break
+
+                        # 패킷 파싱
+                        if nbytes < 12:
+                            continue
+
+                        seq_num, total, data_size = _PKT_HDR.unpack_from(
+                            recv_buf, 0
+                        )
+                        if seq_num < total_chunks:
+                            # 수신 버퍼는 재사용되므로 payload를 복사해
+                            # 쓰기 스레드로 넘긴다
+                            write_queue.put(
+                                (seq_num, bytes(recv_view[12 : 12 + data_size]))
                             )
+                            if not (seen[seq_num >> 3] >> (seq_num & 7)) & 1:
+                                seen[seq_num >> 3] |= 1 << (seq_num & 7)
+                                received_packets += 1
+                        last_packet_time = time.time()
+
+                        # 진행률 출력 (4096패킷마다 + 마지막에만 갱신)
+                        if (
+                            received_packets & 0xFFF
+                        ) == 0 or received_packets == total_chunks:
+                            sys.stdout.write(
+                                f"\r수신 진행률: {received_packets * inv_total:.1f}% ({received_packets}/{total_chunks} 패킷)"
+                            )
+                            sys.stdout.flush()
+
+                    except socket.timeout:
+                        # 일정 시간 동안 패킷이 없으면 종료
+                        if time.time() - last_packet_time > 3.0:
+                            logger.info(f"\n타임아웃 - 수신 종료")
+                            break
+
+                # 쓰기 스레드가 큐를 비우고 끝날 때까지 기다린다
+                write_queue.put(None)
+                writer.join()
+
+                print()  # 줄바꿈
+                receive_time = time.time() - start_time
+
+                # 패킷 손실 확인
+                expected_packets = total_chunks
+                packet_loss = expected_packets - received_packets
+                loss_rate = (
+                    (packet_loss / expected_packets * 100)
+                    if expected_packets > 0
+                    else 0
+                )
 
-                        except socket.timeout:
-                            # 일정 시간 동안 패킷이 없으면 종료
-                            if time.time() - last_packet_time > 3.0:
-                                logger.info(f"\n타임아웃 - 수신 종료")
-                                break
-
-                    print()  # 줄바꿈
-                    receive_time = time.time() - start_time
-
-                    # 패킷 손실 확인
-                    received_packets = len(chunks)
-                    expected_packets = total_chunks
-                    packet_loss = expected_packets - received_packets
-                    loss_rate = (
-                        (packet_loss / expected_packets * 100)
-                        if expected_packets > 0
-                        else 0
+                # 파일 재조합 및 저장
+                success = False
+                error_message = ""
+
+                if packet_loss == 0:
+                    # 손실 없음 - mmap에 이미 기록된 내용을 디스크로 내린다
+                    write_start = time.time()
+                    if mm is not None:
+                        mm.flush()
+                        mm.close()
+                    try:
+                        # 다 쓴 파일의 페이지가 캐시를 차지하지 않게 한다
+                        os.posix_fadvise(
+                            out_file.fileno(),
+                            0,
+                            filesize,
+                            os.POSIX_FADV_DONTNEED,
+                        )
+                    except (AttributeError, OSError):
+                        pass
+                    out_file.close()
+                    write_end = time.time()
+                    write_time = write_end - write_start
+                    total_time = write_end - start_time
+                    actual_size = os.path.getsize(filepath)
+                    transfer_speed = actual_size / receive_time / 1024 / 1024
+
+                    # 성공 통계 출력
+                    logger.info(f"\n{'='*50}")
+                    logger.info(f"파일 수신 완료: {filename}")
+                    logger.info(
+                        f"파일 크기: {actual_size:,} bytes ({actual_size/1024/1024:.2f} MB)"
                     )
+                    logger.info(f"순수 전송 시간: {receive_time:.2f}초")
+                    logger.info(f"전송 속도: {transfer_speed:.2f} MB/s")
+                    logger.info(f"파일 쓰기 시간: {write_time:.2f}초")
+                    logger.info(f"전체 시간: {total_time:.2f}초")
+                    logger.info(f"수신 패킷: {received_packets}/{expected_packets}")
+                    logger.info(f"패킷 손실: 없음 ✓")
+                    logger.info(f"저장 경로: {filepath}")
+                    logger.info(f"{'='*50}")
+                    logger.debug(f"{transfer_speed}")
+
+                    success = True
+                else:
+                    # 패킷 손실 발생 - 구멍 난 파일은 남기지 않는다
+                    if mm is not None:
+                        mm.close()
+                    out_file.close()
+                    os.remove(filepath)
+                    missing_packets = [
+                        i
+                        for i in range(total_chunks)
+                        if not (seen[i >> 3] >> (i & 7)) & 1
+                    ]
+
+                    logger.error(f"\n{'='*50}")
+                    logger.error(f"❌ UDP 전송 실패: 패킷 손실 감지")
+                    logger.error(f"파일: {filename}")
+                    logger.error(f"예상 크기: {filesize:,} bytes")
+                    logger.error(
+                        f"수신 패킷: {received_packets}/{expected_packets}"
+                    )
+                    logger.error(f"손실 패킷: {packet_loss}")
+                    logger.error(f"손실률: {loss_rate:.2f}%")
+                    logger.error(
+                        f"누락된 패킷 번호 (처음 10개): {missing_packets[:10]}"
+                    )
+                    if len(missing_packets) > 10:
+                        logger.error(f"... 외 {len(missing_packets) - 10}개")
+                    logger.error(f"{'='*50}")
 
-                    # 파일 재조합 및 저장
+                    error_message = (
+                        f"패킷 손실 {packet_loss}개 (손실률 {loss_rate:.2f}%)"
+                    )
                     success = False
-                    error_message = ""
-
-                    if packet_loss == 0:
-                        # 손실 없음 - 파일 저장
-                        filepath = os.path.join(target_dir, filename)
-                        filepath = make_new_filename(filepath)
-
-                        write_start = time.time()
-                        with open(filepath, "wb") as f:
-                            for i in range(total_chunks):
-                                if i in chunks:
-                                    f.write(chunks[i])
-
-                        write_end = time.time()
-                        write_time = write_end - write_start
-                        total_time = write_end - start_time
-                        actual_size = os.path.getsize(filepath)
-                        transfer_speed = actual_size / receive_time / 1024 / 1024
-
-                        # 성공 통계 출력
-                        logger.info(f"\n{'='*50}")
-                        logger.info(f"파일 수신 완료: {filename}")
-                        logger.info(
-                            f"파일 크기: {actual_size:,} bytes ({actual_size/1024/1024:.2f} MB)"
-                        )
-                        logger.info(f"순수 전송 시간: {receive_time:.2f}초")
-                        logger.info(f"전송 속도: {transfer_speed:.2f} MB/s")
-                        logger.info(f"파일 쓰기 시간: {write_time:.2f}초")
-                        logger.info(f"전체 시간: {total_time:.2f}초")
-                        logger.info(f"수신 패킷: {received_packets}/{expected_packets}")
-                        logger.info(f"패킷 손실: 없음 ✓")
-                        logger.info(f"저장 경로: {filepath}")
-                        logger.info(f"{'='*50}")
-                        logger.debug(f"{transfer_speed}")
-
-                        success = True
-                    else:
-                        # 패킷 손실 발생 - 에러 처리
-                        missing_packets = [
-                            i for i in range(total_chunks) if i not in chunks
-                        ]
-
-                        logger.error(f"\n{'='*50}")
-                        logger.error(f"❌ UDP 전송 실패: 패킷 손실 감지")
-                        logger.error(f"파일: {filename}")
-                        logger.error(f"예상 크기: {filesize:,} bytes")
-                        logger.error(
-                            f"수신 패킷: {received_packets}/{expected_packets}"
-                        )
-                        logger.error(f"손실 패킷: {packet_loss}")
-                        logger.error(f"손실률: {loss_rate:.2f}%")
-                        logger.error(
-                            f"누락된 패킷 번호 (처음 10개): {missing_packets[:10]}"
-                        )
-                        if len(missing_packets) > 10:
-                            logger.error(f"... 외 {len(missing_packets) - 10}개")
-                        logger.error(f"{'='*50}")
 
-                        error_message = (
-                            f"패킷 손실 {packet_loss}개 (손실률 {loss_rate:.2f}%)"
-                        )
-                        success = False
-
-                    # 클라이언트에 결과 응답
-                    response = {
-                        "success": success,
-                        "received_packets": received_packets,
-                        "expected_packets": expected_packets,
-                        "packet_loss": packet_loss,
-                        "loss_rate": loss_rate,
-                        "error": error_message,
-                    }
-                    response_json = json.dumps(response).encode("utf-8")
-                    sock.sendto(response_json, client_address)
-
-                    # 타임아웃 해제
-                    sock.settimeout(None)
-
-                except json.JSONDecodeError:
-                    logger.error("잘못된 파일 정보 패킷")
-                    continue
-                except Exception as e:
-                    logger.error(f"수신 중 오류 발생: {e}")
-                    continue
+                # 클라이언트에 결과 응답
+                response = {
+                    "success": success,
+                    "received_packets": received_packets,
+                    "expected_packets": expected_packets,
+                    "packet_loss": packet_loss,
+                    "loss_rate": loss_rate,
+                    "error": error_message,
+                }
+                response_json = json_dumps(response)
+                sock.sendto(response_json, client_address)
+
+                # 타임아웃 해제
+                sock.settimeout(None)
+
+            except ValueError:
+                logger.error("잘못된 파일 정보 패킷")
+                continue
+            except Exception as e:
+                logger.error(f"수신 중 오류 발생: {e}")
+                continue
 
-        except KeyboardInterrupt:
-            logger.info("\n서버를 종료합니다.")
-        finally:
-            sock.close()
@@ -1,7 +1,159 @@
+import ctypes
+import errno
 import os
+import select
+import socket
 
 from protocol import BUFFER_SIZE
 
+# C 확장인 orjson이 있으면 JSON 직렬화/역직렬화에 사용한다
+# (orjson.dumps는 bytes를 바로 반환해 중간 str 인코딩이 없다)
+try:
+    import orjson
+
+    def json_dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    json_loads = orjson.loads
+except ImportError:
+    import json as _json
+
+    def json_dumps(obj) -> bytes:
+        return _json.dumps(obj).encode("utf-8")
+
+    json_loads = _json.loads
+
+# 리눅스의 sendmmsg(2)가 있으면 UDP 패킷 여러 개를 시스템콜 한 번으로 보낸다
+try:
+    _libc = ctypes.CDLL(None, use_errno=True)
+    _sendmmsg = _libc.sendmmsg
+    SENDMMSG_AVAILABLE = True
+except (OSError, AttributeError):
+    _sendmmsg = None
+    SENDMMSG_AVAILABLE = False
+
+# 한 번의 sendmmsg 호출에 담는 최대 패킷 수
+SENDMMSG_BATCH = 64
+
+
+class _Iovec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _Msghdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint),
+        ("msg_iov", ctypes.POINTER(_Iovec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class _Mmsghdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _Msghdr), ("msg_len", ctypes.c_uint)]
+
+
+class _SockaddrIn(ctypes.Structure):
+    _fields_ = [
+        ("sin_family", ctypes.c_ushort),
+        ("sin_port", ctypes.c_uint16),
+        ("sin_addr", ctypes.c_ubyte * 4),
+        ("sin_zero", ctypes.c_char * 8),
+    ]
+
+
+# 호스트명 → IP 변환 결과 캐시. send_packets는 전송 루프 안에서
+# 배치마다 불리므로 DNS 조회를 매번 반복하지 않는다
+_resolved_hosts = {}
+
+
+def _resolve_host(host: str) -> str:
+    ip = _resolved_hosts.get(host)
+    if ip is None:
+        ip = socket.gethostbyname(host)
+        _resolved_hosts[host] = ip
+    return ip
+
+
+def _pack_sockaddr(address: tuple) -> _SockaddrIn:
+    host, port = address
+    addr = _SockaddrIn()
+    addr.sin_family = socket.AF_INET
+    addr.sin_port = socket.htons(port)
+    addr.sin_addr = (ctypes.c_ubyte * 4)(
+        *socket.inet_aton(_resolve_host(host))
+    )
+    return addr
+
+
+def send_packets(sock: socket.socket, packets: list, address: tuple):
+    """
+    UDP 패킷 목록을 address로 전송합니다.
+
+    리눅스에서는 sendmmsg(2)로 여러 패킷을 시스템콜 한 번에 보내고,
+    사용할 수 없는 환경에서는 sendto 루프로 동일하게 동작합니다.
+    Args:
+        sock : 전송에 사용할 UDP socket입니다.
+        packets : 전송할 패킷(bytes/bytearray/memoryview) 목록입니다.
+        address : 전송 대상 (host, port) 주소입니다.
+    """
+    if _sendmmsg is None:
+        # 폴백 경로도 매 호출 호스트명을 다시 풀지 않도록 IP로 보낸다
+        resolved = (_resolve_host(address[0]), address[1])
+        for packet in packets:
+            sock.sendto(packet, resolved)
+        return
+
+    sockaddr = _pack_sockaddr(address)
+    fd = sock.fileno()
+
+    for base in range(0, len(packets), SENDMMSG_BATCH):
+        group = packets[base : base + SENDMMSG_BATCH]
+        count = len(group)
+        iovecs = (_Iovec * count)()
+        msgs = (_Mmsghdr * count)()
+        keepalive = []
+
+        for i, packet in enumerate(group):
+            length = len(packet)
+            if isinstance(packet, bytes):
+                # bytes는 내부 버퍼 포인터를 그대로 사용 (복사 없음)
+                ptr = ctypes.cast(ctypes.c_char_p(packet), ctypes.c_void_p)
+            else:
+                buf = (ctypes.c_char * length).from_buffer(packet)
+                keepalive.append(buf)
+                ptr = ctypes.cast(buf, ctypes.c_void_p)
+            iovecs[i].iov_base = ptr
+            iovecs[i].iov_len = length
+            msgs[i].msg_hdr.msg_name = ctypes.cast(
+                ctypes.byref(sockaddr), ctypes.c_void_p
+            )
+            msgs[i].msg_hdr.msg_namelen = ctypes.sizeof(sockaddr)
+            msgs[i].msg_hdr.msg_iov = ctypes.pointer(iovecs[i])
+            msgs[i].msg_hdr.msg_iovlen = 1
+
+        sent = 0
+        while sent < count:
+            result = _sendmmsg(
+                fd,
+                ctypes.byref(msgs, sent * ctypes.sizeof(_Mmsghdr)),
+                count - sent,
+                0,
+            )
+            if result < 0:
+                err = ctypes.get_errno()
+                if err == errno.EINTR:
+                    continue
+                if err in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    # 논블로킹 소켓의 송신 버퍼가 가득 찼으면 비워질 때까지 대기
+                    select.select([], [sock], [])
+                    continue
+                raise OSError(err, os.strerror(err))
+            sent += result
+
 
 def make_new_filename(filepath: str):
     """
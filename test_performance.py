@@ -10,154 +10,468 @@
     클라이언트: python test_performance.py --mode client --file test.jpg --target 192.168.0.60
 """
 
+import collections
+import mmap
+import select
+import signal
 import subprocess
+import threading
 import time
+import types
 import json
 import re
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from statistics import fmean, stdev
 from pathlib import Path
 from typing import Dict, List, Optional
 import argparse
 
+# numpy가 있으면 통계 집계를 한 번의 벡터 연산으로 처리한다
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# pandas가 있으면 전체 스윕에 대한 groupby 집계표를 추가로 출력한다
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+# orjson이 있으면 결과 직렬화에 사용한다 (stdlib json보다 수 배 빠름)
+try:
+    import orjson
+
+    def _json_line(obj) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+except ImportError:
+    def _json_line(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
+# 프로토콜별 기본 포트 - 서버 모드와 클라이언트 모드가 같은 값을 쓰도록
+# 한 곳에서만 정의하고, 실수로 수정되지 않게 읽기 전용으로 둔다
+_PROTO_PORTS = types.MappingProxyType(
+    {"tcp": 10000, "udp": 9998, "rudp": 9999, "quic": 4433}
+)
+
+# 로그 파싱용 정규식은 호출마다 컴파일하지 않도록 모듈 수준에 둔다
+_SPEED_RE = re.compile(
+    r"(?:전송 속도|transfer speed):\s*(\d+\.?\d*)\s*MB/s|(\d+\.?\d*)\s*MB/s",
+    re.IGNORECASE,
+)
+_LOSS_RE = re.compile(
+    r"(?:패킷 손실률|손실률|packet loss rate):\s*(\d+\.?\d*)%",
+    re.IGNORECASE,
+)
+
+
+@dataclass(slots=True)
+class TrialResult:
+    """전송 1회의 결과 (dict보다 메모리가 작고 필드가 고정된다)"""
+
+    success: bool
+    speed: Optional[float] = None
+    packet_loss: Optional[float] = None
+    output: str = ""
+    error: str = ""
+
 
 class PerformanceTest:
     """프로토콜 성능 테스트"""
 
-    def __init__(self, test_file: str, target: str = "localhost", iterations: int = 10, interval: float = 0.0):
+    __slots__ = (
+        "test_file",
+        "_file_size",
+        "_file_mtime",
+        "target",
+        "iterations",
+        "interval",
+        "cooldown",
+        "so_sndbuf",
+        "so_rcvbuf",
+        "warmup",
+        "prefault",
+        "results",
+        "_workers",
+        "_base_cmds",
+        "_results_lock",
+        "protocols",
+        "_worker_locks",
+        "pin_cpu",
+        "_proto_cores",
+        "_trials",
+    )
+
+    def __init__(
+        self,
+        test_file: str,
+        target: str = "localhost",
+        iterations: int = 10,
+        interval: float = 0.0,
+        cooldown: float = 2.0,
+        pin_cpu: bool = False,
+        so_sndbuf: int = 0,
+        so_rcvbuf: int = 0,
+        warmup: int = 1,
+        prefault: bool = True,
+    ):
         self.test_file = test_file
+        # 스윕 도중 파일이 바뀌어도 기록이 어긋나지 않도록 한 번만 stat한다
+        st = os.stat(test_file)
+        self._file_size = st.st_size
+        self._file_mtime = st.st_mtime
         self.target = target
         self.iterations = iterations
         self.interval = interval
+        self.cooldown = cooldown
+        self.so_sndbuf = so_sndbuf
+        self.so_rcvbuf = so_rcvbuf
+        self.warmup = warmup
+        self.prefault = prefault
         self.results = {}
+        self._trials: List[Dict] = []
+        self._workers: Dict[str, subprocess.Popen] = {}
+        self._base_cmds: Dict[str, tuple] = {}
+        self._results_lock = threading.Lock()
 
         # 프로토콜별 포트 설정
-        self.protocols = {"tcp": 10000, "udp": 9998, "rudp": 9999, "quic": 4433}
+        self.protocols = _PROTO_PORTS
+
+        # 같은 프로토콜의 워커를 여러 스레드가 동시에 쓰지 못하도록 직렬화한다
+        self._worker_locks = {p: threading.Lock() for p in self.protocols}
+
+        # --pin-cpu: 프로토콜마다 코어를 라운드로빈으로 고정해 스케줄러
+        # 마이그레이션으로 인한 측정 편차를 줄인다
+        self.pin_cpu = pin_cpu
+        self._proto_cores: Dict[str, int] = {}
+        if pin_cpu and hasattr(os, "sched_getaffinity"):
+            cores = sorted(os.sched_getaffinity(0))
+            for i, proto in enumerate(self.protocols):
+                self._proto_cores[proto] = cores[i % len(cores)]
+
+    def _prefault_test_file(self):
+        """테스트 파일을 페이지 캐시에 미리 올립니다.
+
+        첫 전송이 디스크 콜드 캐시 미스를 측정하지 않도록 모든 페이지를
+        미리 읽어 둔다 (디스크 I/O 포함 측정은 --no-prefault로 끈다).
+        """
+        try:
+            with open(self.test_file, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)
+                try:
+                    if hasattr(mm, "madvise"):
+                        mm.madvise(mmap.MADV_WILLNEED)
+                    # 페이지를 실제로 건드려 상주시킨다
+                    for i in range(0, len(mm), 4096):
+                        mm[i]
+                finally:
+                    mm.close()
+        except (OSError, ValueError) as e:
+            print(f"테스트 파일 프리폴트 실패 (무시): {e}")
 
     def extract_speed(self, output: str) -> Optional[float]:
         """로그에서 전송 속도 추출 (MB/s)"""
-        # 다양한 패턴 시도
-        patterns = [
-            r"전송 속도:\s*(\d+\.?\d*)\s*MB/s",
-            r"transfer speed:\s*(\d+\.?\d*)\s*MB/s",
-            r"(\d+\.?\d*)\s*MB/s",
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, output, re.IGNORECASE)
-            if match:
-                return float(match.group(1))
+        # 속도는 출력 끝부분에 찍히므로 마지막 2KB만 검색한다
+        match = _SPEED_RE.search(output[-2048:])
+        if match:
+            return float(match.group(1) or match.group(2))
         return None
 
     def extract_packet_loss(self, output: str) -> Optional[float]:
         """로그에서 패킷 손실률 추출 (%)"""
-        patterns = [
-            r"패킷 손실률:\s*(\d+\.?\d*)%",
-            r"손실률:\s*(\d+\.?\d*)%",
-            r"packet loss rate:\s*(\d+\.?\d*)%",
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, output, re.IGNORECASE)
-            if match:
-                return float(match.group(1))
+        match = _LOSS_RE.search(output[-2048:])
+        if match:
+            return float(match.group(1))
         return None
 
-    def run_single_test(self, protocol: str, buffer_size: int = 1) -> Dict:
-        """단일 테스트 실행"""
+    def _preexec_fn(self, protocol: str):
+        """자식 프로세스를 전용 코어에 고정하는 preexec 함수를 반환합니다."""
+        core = self._proto_cores.get(protocol)
+        if core is None:
+            return None
+        return lambda: os.sched_setaffinity(0, {core})
+
+    def _get_worker(self, protocol: str) -> subprocess.Popen:
+        """프로토콜별 상주 워커 프로세스를 반환합니다 (없으면 생성)."""
+        worker = self._workers.get(protocol)
+        if worker is None or worker.poll() is not None:
+            worker = subprocess.Popen(
+                [
+                    "python3",
+                    "src/main.py",
+                    "--worker",
+                    "True",
+                    "--protocol",
+                    protocol,
+                    "--so_sndbuf",
+                    str(self.so_sndbuf),
+                    "--so_rcvbuf",
+                    str(self.so_rcvbuf),
+                ],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                bufsize=1,
+                preexec_fn=self._preexec_fn(protocol),
+            )
+            self._workers[protocol] = worker
+        return worker
+
+    def _stop_worker(self, protocol: str):
+        """워커를 종료합니다 (응답 불능 시 강제 종료)."""
+        worker = self._workers.pop(protocol, None)
+        if worker is None:
+            return
+        try:
+            worker.stdin.close()
+            worker.wait(timeout=2)
+        except Exception:
+            worker.kill()
+
+    def shutdown_workers(self):
+        """모든 상주 워커를 종료합니다."""
+        for protocol in list(self._workers):
+            self._stop_worker(protocol)
+
+    def run_single_test(
+        self, protocol: str, buffer_size: int = 1, batch_size: int = 0
+    ) -> TrialResult:
+        """단일 테스트 실행
+
+        전송마다 인터프리터를 새로 띄우지 않도록 프로토콜별 상주 워커에
+        명령을 보내고 JSON 한 줄로 결과를 받는다. 워커를 쓸 수 없으면
+        기존처럼 subprocess를 새로 띄우는 경로로 대체한다.
+        """
         port = self.protocols[protocol]
 
+        try:
+            with self._worker_locks[protocol]:
+                return self._run_single_test_worker(
+                    protocol, port, buffer_size, batch_size
+                )
+        except Exception:
+            # 워커 경로가 실패하면 단발성 subprocess로 대체한다
+            self._stop_worker(protocol)
+            return self._run_single_test_subprocess(protocol, buffer_size, batch_size)
+
+    def _run_single_test_worker(
+        self, protocol: str, port: int, buffer_size: int, batch_size: int = 0
+    ) -> TrialResult:
+        """상주 워커에 전송 명령을 보내고 응답 한 줄을 읽습니다."""
+        worker = self._get_worker(protocol)
+        worker.stdin.write(
+            f"SEND {self.test_file} {self.target} {port} {buffer_size} "
+            f"{self.interval} {batch_size}\n"
+        )
+        worker.stdin.flush()
+
+        # 워커가 멈춘 경우를 대비해 30초까지만 응답을 기다린다
+        ready, _, _ = select.select([worker.stdout], [], [], 30)
+        if not ready:
+            self._stop_worker(protocol)
+            return TrialResult(success=False, error="Timeout")
+        line = worker.stdout.readline()
+        if not line:
+            raise RuntimeError("워커가 응답 없이 종료되었습니다.")
+
+        response = json.loads(line)
+        return TrialResult(
+            success=response.get("success", False),
+            speed=response.get("speed"),
+            packet_loss=response.get("packet_loss"),
+            output=line.strip(),
+            error=response.get("error") or "",
+        )
+
+    def _base_cmd(self, protocol: str) -> tuple:
+        """반복마다 바뀌지 않는 명령 인자를 한 번만 만들어 재사용합니다."""
+        base = self._base_cmds.get(protocol)
+        if base is None:
+            base = (
+                "python3",
+                "src/main.py",
+                "--file",
+                self.test_file,
+                "--client",
+                "True",
+                "--protocol",
+                protocol,
+                "--target",
+                self.target,
+                "--port",
+                str(self.protocols[protocol]),
+                "--interval",
+                str(self.interval),
+                "--so_sndbuf",
+                str(self.so_sndbuf),
+                "--so_rcvbuf",
+                str(self.so_rcvbuf),
+            )
+            self._base_cmds[protocol] = base
+        return base
+
+    def _run_single_test_subprocess(
+        self, protocol: str, buffer_size: int = 1, batch_size: int = 0
+    ) -> TrialResult:
+        """단발성 subprocess로 테스트를 실행합니다 (워커 대체 경로)."""
         cmd = [
-            "python3",
-            "src/main.py",
-            "--file",
-            self.test_file,
-            "--client",
-            "True",
-            "--protocol",
-            protocol,
-            "--target",
-            self.target,
-            "--port",
-            str(port),
+            *self._base_cmd(protocol),
             "--buffer_size",
             str(buffer_size),
-            "--interval",
-            str(self.interval),
+            "--batch_size",
+            str(batch_size),
         ]
 
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-
-            output = result.stdout + result.stderr
+            # 자식이 헬퍼 프로세스를 만들어도 한꺼번에 정리할 수 있도록
+            # 별도 프로세스 그룹에서 실행한다
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+                start_new_session=True,
+                preexec_fn=self._preexec_fn(protocol),
+            )
+            # 전체 출력을 메모리에 쌓지 않고 마지막 64줄만 유지하며,
+            # 줄이 들어올 때마다 바로 파싱해 둘 다 찾으면 읽기를 끝낸다
+            tail = collections.deque(maxlen=64)
+            speed = None
+            packet_loss = None
+            deadline = time.monotonic() + 30
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise subprocess.TimeoutExpired(cmd, 30)
+                ready, _, _ = select.select([process.stdout], [], [], remaining)
+                if not ready:
+                    raise subprocess.TimeoutExpired(cmd, 30)
+                line = process.stdout.readline()
+                if not line:
+                    break
+                tail.append(line)
+                if speed is None:
+                    match = _SPEED_RE.search(line)
+                    if match:
+                        speed = float(match.group(1) or match.group(2))
+                if packet_loss is None:
+                    match = _LOSS_RE.search(line)
+                    if match:
+                        packet_loss = float(match.group(1))
+                if speed is not None and packet_loss is not None:
+                    process.stdout.close()
+                    break
+            returncode = process.wait(timeout=max(deadline - time.monotonic(), 1))
 
-            # 전송 속도 추출
-            speed = self.extract_speed(output)
-            packet_loss = self.extract_packet_loss(output)
+            output = "".join(tail)
 
-            success = result.returncode == 0 and speed is not None
+            success = returncode == 0 and speed is not None
 
-            return {
-                "success": success,
-                "speed": speed,
-                "packet_loss": packet_loss,
-                "output": (
-                    output[-500:] if len(output) > 500 else output
-                ),  # 마지막 500자만
-            }
+            return TrialResult(
+                success=success,
+                speed=speed,
+                packet_loss=packet_loss,
+                output=output[-500:] if len(output) > 500 else output,  # 마지막 500자만
+            )
 
         except subprocess.TimeoutExpired:
-            return {
-                "success": False,
-                "speed": None,
-                "packet_loss": None,
-                "error": "Timeout",
-            }
+            # SIGKILL을 프로세스 그룹 전체에 보내 고아 프로세스가 포트를
+            # 잡고 있다가 다음 반복을 망치는 일을 막는다
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            process.wait()
+            return TrialResult(success=False, error="Killed after timeout")
         except Exception as e:
-            return {
-                "success": False,
-                "speed": None,
-                "packet_loss": None,
-                "error": str(e),
-            }
-
-    def test_protocol(self, protocol: str, buffer_size: int = 1) -> Dict:
+            return TrialResult(success=False, error=str(e))
+
+    def test_protocol(
+        self, protocol: str, buffer_size: int = 1, batch_size: int = 0
+    ) -> Dict:
         """특정 프로토콜에 대해 여러 번 테스트"""
-        print(f"\n{'='*60}")
-        print(f"테스트 시작: {protocol.upper()} (버퍼 크기: {buffer_size}, interval: {self.interval})")
-        print(f"{'='*60}")
+        print(
+            f"\n{'='*60}\n"
+            f"테스트 시작: {protocol.upper()} "
+            f"(버퍼 크기: {buffer_size}, 배치: {batch_size or '기본'}, interval: {self.interval})\n"
+            f"{'='*60}",
+            flush=True,
+        )
 
         results = []
         speeds = []
         packet_losses = []
+        consecutive_failures = 0
+        aborted_early = False
 
-        for i in range(self.iterations):
-            print(f"\n[{i+1}/{self.iterations}] 전송 중...", end=" ", flush=True)
+        label = f"{protocol.upper()}(b{buffer_size})"
 
-            result = self.run_single_test(protocol, buffer_size)
+        # 콜드 스타트(인터프리터/핸드셰이크/slow start) 영향을 빼기 위해
+        # 기록하지 않는 워밍업 전송을 먼저 수행한다
+        for w in range(self.warmup):
+            print(f"[{label}] 워밍업 {w+1}/{self.warmup}...", flush=True)
+            self.run_single_test(protocol, buffer_size, batch_size)
+            if self.cooldown > 0:
+                time.sleep(self.cooldown)
+
+        for i in range(self.iterations):
+            result = self.run_single_test(protocol, buffer_size, batch_size)
             results.append(result)
 
-            if result["success"]:
-                speeds.append(result["speed"])
-                if result["packet_loss"] is not None:
-                    packet_losses.append(result["packet_loss"])
-                print(f"✓ {result['speed']:.2f} MB/s")
+            # 사후 분석(pandas 등)을 위한 원시 시행 기록
+            with self._results_lock:
+                self._trials.append(
+                    {
+                        "protocol": protocol,
+                        "buffer_size": buffer_size,
+                        "batch_size": batch_size,
+                        "trial_idx": i,
+                        "success": result.success,
+                        "speed": result.speed,
+                        "packet_loss": result.packet_loss,
+                    }
+                )
+
+            # 여러 프로토콜이 동시에 돌 수 있으므로 줄 단위로 출력한다
+            if result.success:
+                consecutive_failures = 0
+                speeds.append(result.speed)
+                if result.packet_loss is not None:
+                    packet_losses.append(result.packet_loss)
+                print(f"[{label} {i+1}/{self.iterations}] ✓ {result.speed:.2f} MB/s", flush=True)
             else:
-                print(f"✗ 실패")
-                if "error" in result:
-                    print(f"   에러: {result['error']}")
+                consecutive_failures += 1
+                error = f" 에러: {result.error}" if result.error else ""
+                print(f"[{label} {i+1}/{self.iterations}] ✗ 실패{error}", flush=True)
+
+            # 프로토콜이 죽어 있으면 남은 반복이 전부 타임아웃만 기다리게
+            # 되므로 연속 실패 3회에서 조기 중단한다
+            if consecutive_failures >= 3:
+                print(
+                    f"[{label}] 🛑 연속 {consecutive_failures}회 실패 - 조기 중단",
+                    flush=True,
+                )
+                aborted_early = True
+                break
 
             # 다음 테스트 전 대기
-            if i < self.iterations - 1:
-                time.sleep(2)
+            if self.cooldown > 0 and i < self.iterations - 1:
+                time.sleep(self.cooldown)
 
         # 통계 계산
         success_count = len(speeds)
         success_rate = (success_count / self.iterations) * 100
 
         stats = {
+            "aborted_early": aborted_early,
             "protocol": protocol,
             "buffer_size": buffer_size,
+            "batch_size": batch_size,
             "iterations": self.iterations,
             "success_count": success_count,
             "success_rate": success_rate,
@@ -166,38 +480,52 @@ class PerformanceTest:
         }
 
         if speeds:
-            stats.update(
-                {
-                    "avg_speed": sum(speeds) / len(speeds),
-                    "min_speed": min(speeds),
-                    "max_speed": max(speeds),
-                    "std_dev": self._std_dev(speeds),
-                }
-            )
+            if np is not None:
+                arr = np.asarray(speeds, dtype=np.float64)
+                stats.update(
+                    {
+                        "avg_speed": float(arr.mean()),
+                        "min_speed": float(arr.min()),
+                        "max_speed": float(arr.max()),
+                        "std_dev": float(arr.std(ddof=1)) if arr.size >= 2 else 0.0,
+                    }
+                )
+            else:
+                stats.update(
+                    {
+                        "avg_speed": fmean(speeds),
+                        "min_speed": min(speeds),
+                        "max_speed": max(speeds),
+                        "std_dev": stdev(speeds) if len(speeds) >= 2 else 0.0,
+                    }
+                )
 
         if packet_losses:
-            stats.update(
-                {
-                    "avg_packet_loss": sum(packet_losses) / len(packet_losses),
-                    "min_packet_loss": min(packet_losses),
-                    "max_packet_loss": max(packet_losses),
-                }
-            )
+            if np is not None:
+                arr = np.asarray(packet_losses, dtype=np.float64)
+                stats.update(
+                    {
+                        "avg_packet_loss": float(arr.mean()),
+                        "min_packet_loss": float(arr.min()),
+                        "max_packet_loss": float(arr.max()),
+                    }
+                )
+            else:
+                stats.update(
+                    {
+                        "avg_packet_loss": fmean(packet_losses),
+                        "min_packet_loss": min(packet_losses),
+                        "max_packet_loss": max(packet_losses),
+                    }
+                )
 
         return stats
 
-    def _std_dev(self, data: List[float]) -> float:
-        """표준편차 계산"""
-        if len(data) < 2:
-            return 0.0
-        mean = sum(data) / len(data)
-        variance = sum((x - mean) ** 2 for x in data) / (len(data) - 1)
-        return variance**0.5
-
     def run_all_tests(
         self,
         protocols: Optional[List[str]] = None,
         buffer_sizes: Optional[List[int]] = None,
+        batch_sizes: Optional[List[int]] = None,
     ):
         """모든 프로토콜 테스트"""
         if protocols is None:
@@ -206,50 +534,107 @@ class PerformanceTest:
         if buffer_sizes is None:
             buffer_sizes = [1]
 
+        if batch_sizes is None:
+            batch_sizes = [0]
+
         print(f"\n{'='*60}")
         print(f"성능 테스트 시작")
         print(f"{'='*60}")
         print(f"테스트 파일: {self.test_file}")
-        print(f"파일 크기: {os.path.getsize(self.test_file):,} bytes")
+        print(f"파일 크기: {self._file_size:,} bytes")
         print(f"대상 서버: {self.target}")
         print(f"반복 횟수: {self.iterations}")
         print(f"전송 간격: {self.interval}초")
         print(f"테스트 프로토콜: {', '.join(p.upper() for p in protocols)}")
+
+        if self.prefault:
+            self._prefault_test_file()
         print(f"버퍼 크기: {buffer_sizes}")
 
         all_results = []
 
-        for protocol in protocols:
-            for buffer_size in buffer_sizes:
-                try:
-                    result = self.test_protocol(protocol, buffer_size)
-                    all_results.append(result)
-                    self.results[f"{protocol}_b{buffer_size}"] = result
-                except KeyboardInterrupt:
-                    print("\n\n테스트 중단됨")
-                    break
+        # 설정마다 포트가 다르므로 (프로토콜, 버퍼, 배치) 조합을 병렬로 돌린다
+        jobs = [
+            (p, b, k) for p in protocols for b in buffer_sizes for k in batch_sizes
+        ]
+
+        # 중간에 끊겨도 완료된 결과는 남도록 한 설정 끝날 때마다 한 줄씩 기록한다
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        jsonl_filename = f"test_results_{timestamp}.jsonl"
+        jsonl_file = open(jsonl_filename, "w", encoding="utf-8")
+        print(f"결과 기록(JSONL): {jsonl_filename}")
+
+        # 동시에 도는 설정 수를 제한해 링크가 포화되지 않도록 한다
+        max_workers = min(len(jobs), len(self.protocols))
+
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(self.test_protocol, p, b, k): (p, b, k)
+                    for p, b, k in jobs
+                }
+                for future in as_completed(futures):
+                    protocol, buffer_size, batch_size = futures[future]
+                    result = future.result()
+                    key = f"{protocol}_b{buffer_size}"
+                    if batch_size:
+                        key += f"_k{batch_size}"
+                    with self._results_lock:
+                        all_results.append(result)
+                        self.results[key] = result
+                        jsonl_file.write(_json_line(result) + "\n")
+                        jsonl_file.flush()
+        except KeyboardInterrupt:
+            print("\n\n테스트 중단됨")
+        finally:
+            self.shutdown_workers()
+            jsonl_file.close()
+
+        # 완료 순서가 아니라 요청한 순서대로 요약을 출력한다
+        all_results.sort(
+            key=lambda r: jobs.index(
+                (r["protocol"], r["buffer_size"], r.get("batch_size", 0))
+            )
+        )
 
         # 결과 출력
         self.print_summary(all_results)
 
-        # 결과 저장
-        self.save_results(all_results)
+        # pandas가 있으면 원시 시행 기록에 대한 집계표도 출력한다
+        # (실패 시행의 speed=None은 NaN으로 자연스럽게 제외된다)
+        if pd is not None and self._trials:
+            df = pd.DataFrame(self._trials)
+            agg = df.groupby(["protocol", "buffer_size", "batch_size"])["speed"].agg(
+                ["mean", "min", "max", "std", "count"]
+            )
+            print(f"\n시행별 집계 (pandas):\n{agg}")
 
-    def print_summary(self, results: List[Dict]):
-        """결과 요약 출력"""
-        print(f"\n\n{'='*80}")
-        print(f"{'테스트 결과 요약':^80}")
-        print(f"{'='*80}\n")
+        # 요약 저장 (본 데이터는 JSONL에 이미 기록됨)
+        self.save_results(all_results, timestamp)
 
-        # 헤더
-        print(
-            f"{'프로토콜':<12} {'버퍼':<8} {'성공률':<10} {'평균 속도':<15} {'최소/최대':<20} {'패킷손실':<12}"
-        )
-        print(f"{'-'*80}")
+    def print_summary(self, results: List[Dict]):
+        """결과 요약 출력
+
+        줄마다 print하지 않고 전체 요약을 한 번의 write로 내보낸다.
+        tee나 CI 로그처럼 줄 버퍼링이 섞이는 환경에서도 표가 온전하게
+        남는다.
+        """
+        sep = "-" * 80
+        lines = [
+            "",
+            "",
+            "=" * 80,
+            f"{'테스트 결과 요약':^80}",
+            "=" * 80,
+            "",
+            f"{'프로토콜':<12} {'버퍼':<8} {'배치':<8} {'성공률':<10} {'평균 속도':<15} {'최소/최대':<20} {'패킷손실':<12}",
+            sep,
+        ]
 
         for result in results:
             protocol = result["protocol"].upper()
             buffer_size = result["buffer_size"]
+            batch_size = result.get("batch_size", 0) or "-"
             success_rate = result["success_rate"]
 
             if result.get("avg_speed"):
@@ -264,11 +649,12 @@ class PerformanceTest:
             else:
                 packet_loss = "-"
 
-            print(
-                f"{protocol:<12} {buffer_size:<8} {success_rate:>6.1f}%   {avg_speed:<15} {min_max:<20} {packet_loss:<12}"
+            lines.append(
+                f"{protocol:<12} {buffer_size:<8} {batch_size!s:<8} {success_rate:>6.1f}%   {avg_speed:<15} {min_max:<20} {packet_loss:<12}"
             )
 
-        print(f"{'-'*80}\n")
+        lines.append(sep)
+        lines.append("")
 
         # 가장 빠른 프로토콜
         fastest = max(
@@ -277,7 +663,7 @@ class PerformanceTest:
             default=None,
         )
         if fastest:
-            print(
+            lines.append(
                 f"🏆 가장 빠른 설정: {fastest['protocol'].upper()} "
                 f"(버퍼 크기: {fastest['buffer_size']}) - "
                 f"{fastest['avg_speed']:.2f} MB/s"
@@ -285,21 +671,26 @@ class PerformanceTest:
 
         # 가장 안정적인 프로토콜
         most_reliable = max(results, key=lambda x: x["success_rate"])
-        print(
+        lines.append(
             f"✓ 가장 안정적: {most_reliable['protocol'].upper()} "
             f"(버퍼 크기: {most_reliable['buffer_size']}) - "
             f"성공률 {most_reliable['success_rate']:.1f}%"
         )
 
-    def save_results(self, results: List[Dict]):
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+
+    def save_results(self, results: List[Dict], timestamp: Optional[str] = None):
         """결과를 JSON 파일로 저장"""
-        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        if timestamp is None:
+            timestamp = time.strftime("%Y%m%d_%H%M%S")
         filename = f"test_results_{timestamp}.json"
 
         output = {
             "timestamp": timestamp,
             "test_file": self.test_file,
-            "file_size": os.path.getsize(self.test_file),
+            "file_size": self._file_size,
+            "file_mtime": self._file_mtime,
             "target": self.target,
             "iterations": self.iterations,
             "interval": self.interval,
@@ -312,12 +703,51 @@ class PerformanceTest:
         print(f"\n결과 저장: {filename}")
 
 
+def _read_sysctl(path: str) -> Optional[int]:
+    """proc 파일에서 커널 파라미터 값을 읽습니다 (리눅스 외에서는 None)."""
+    try:
+        with open(path) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def _warn_socket_buffers():
+    """커널 소켓 버퍼 한도가 낮으면 경고와 함께 sysctl 명령을 제안합니다.
+
+    rmem_max/wmem_max가 작으면 측정되는 처리량이 프로토콜이 아니라
+    커널 한도에 의해 잘린다.
+    """
+    min_mem = 4 * 1024 * 1024
+    min_backlog = 5000
+
+    rmem = _read_sysctl("/proc/sys/net/core/rmem_max")
+    wmem = _read_sysctl("/proc/sys/net/core/wmem_max")
+    backlog = _read_sysctl("/proc/sys/net/core/netdev_max_backlog")
+
+    low = []
+    if rmem is not None and rmem < min_mem:
+        low.append(f"rmem_max={rmem}")
+    if wmem is not None and wmem < min_mem:
+        low.append(f"wmem_max={wmem}")
+    if backlog is not None and backlog < min_backlog:
+        low.append(f"netdev_max_backlog={backlog}")
+
+    if low:
+        print(f"⚠️  커널 소켓 버퍼 한도가 낮습니다: {', '.join(low)}")
+        print("   측정 결과가 커널 한도에 막힐 수 있습니다. 권장 설정:")
+        print(
+            "   sudo sysctl -w net.core.rmem_max=12582912 "
+            "net.core.wmem_max=12582912 net.core.netdev_max_backlog=5000"
+        )
+
+
 def start_server(protocol: str, port: Optional[int] = None):
     """서버 시작"""
-    protocols = {"tcp": 10000, "udp": 9998, "rudp": 9999, "quic": 4433}
-
     if port is None:
-        port = protocols.get(protocol, 9999)
+        port = _PROTO_PORTS.get(protocol, 9999)
+
+    _warn_socket_buffers()
 
     print(f"{'='*60}")
     print(f"{protocol.upper()} 서버 시작")
@@ -408,12 +838,53 @@ def main():
         default=[1],
         help="클라이언트 모드: 테스트할 버퍼 크기 (기본: 1)",
     )
+    parser.add_argument(
+        "--batch-sizes",
+        nargs="+",
+        type=int,
+        default=[0],
+        help="클라이언트 모드: 테스트할 sendmmsg 묶음 크기 (0: 프로토콜 기본값)",
+    )
+    parser.add_argument(
+        "--so-sndbuf",
+        type=int,
+        default=0,
+        help="클라이언트 모드: SO_SNDBUF 크기(bytes) (0: 프로토콜 기본값)",
+    )
+    parser.add_argument(
+        "--so-rcvbuf",
+        type=int,
+        default=0,
+        help="클라이언트 모드: SO_RCVBUF 크기(bytes) (0: 프로토콜 기본값)",
+    )
     parser.add_argument(
         "--interval",
         type=float,
         default=0.0,
         help="클라이언트 모드: 패킷 전송 간격(초) (기본: 0.0 - 최대 속도)",
     )
+    parser.add_argument(
+        "--no-prefault",
+        action="store_true",
+        help="클라이언트 모드: 테스트 파일을 페이지 캐시에 미리 올리지 않음",
+    )
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=1,
+        help="클라이언트 모드: 기록하지 않는 워밍업 전송 횟수 (기본: 1)",
+    )
+    parser.add_argument(
+        "--pin-cpu",
+        action="store_true",
+        help="클라이언트 모드: 프로토콜별 전송 프로세스를 전용 CPU 코어에 고정",
+    )
+    parser.add_argument(
+        "--cooldown",
+        type=float,
+        default=2.0,
+        help="클라이언트 모드: 반복 사이 대기 시간(초) (기본: 2.0, 0이면 대기 없음)",
+    )
     parser.add_argument("--port", type=int, help="서버 모드: 포트 번호")
 
     args = parser.parse_args()
@@ -431,8 +902,19 @@ def main():
             print(f"오류: 파일을 찾을 수 없습니다: {args.file}")
             sys.exit(1)
 
-        tester = PerformanceTest(args.file, args.target, args.iterations, args.interval)
-        tester.run_all_tests(args.protocols, args.buffer_sizes)
+        tester = PerformanceTest(
+            args.file,
+            args.target,
+            args.iterations,
+            args.interval,
+            args.cooldown,
+            args.pin_cpu,
+            args.so_sndbuf,
+            args.so_rcvbuf,
+            args.warmup,
+            not args.no_prefault,
+        )
+        tester.run_all_tests(args.protocols, args.buffer_sizes, args.batch_sizes)
 
 
 if __name__ == "__main__":